@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(text):
+    """Lower-case, drop punctuation and collapse whitespace"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+class AnswerCache:
+    """Cache of Gemini answers with an in-memory LRU/TTL tier and an optional Mongo tier.
+
+    Entries are tagged with the crawl version they were generated under. When
+    `version_provider` reports a new version (the scraper finished a crawl)
+    every cached answer is dropped.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, collection=None,
+                 version_provider=None, version_check_interval=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.collection = collection
+        self.version_provider = version_provider
+        self.version_check_interval = version_check_interval
+        self.version = None
+        self._version_checked_at = 0.0
+        self._entries = OrderedDict()
+        self.counters = {
+            'hits': 0,
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def make_key(question, language, context):
+        """Key on the normalized question, the language and a hash of the retrieved context"""
+        context_hash = hashlib.sha1(context.encode('utf-8')).hexdigest()
+        raw = f"{normalize_question(question)}\x1f{language}\x1f{context_hash}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    async def ensure_indexes(self):
+        """Create the TTL index backing the persistent tier, or update its TTL if the setting changed"""
+        if self.collection is None:
+            return
+        existing = (await self.collection.index_information()).get('created_at_1')
+        if existing is None:
+            await self.collection.create_index('created_at', expireAfterSeconds=self.ttl)
+        elif 'expireAfterSeconds' not in existing:
+            # A plain index on the same key; only a TTL index expires entries
+            await self.collection.drop_index('created_at_1')
+            await self.collection.create_index('created_at', expireAfterSeconds=self.ttl)
+        elif existing['expireAfterSeconds'] != self.ttl:
+            await self.collection.database.command(
+                'collMod', self.collection.name,
+                index={'keyPattern': {'created_at': 1}, 'expireAfterSeconds': self.ttl}
+            )
+            logger.info(f"Answer cache TTL changed from {existing['expireAfterSeconds']}s to {self.ttl}s")
+
+    async def refresh_version(self):
+        """Re-read the crawl version (at most every version_check_interval) and invalidate on change"""
+        if self.version_provider is None:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        try:
+            version = await self.version_provider()
+        except Exception as e:
+            logger.warning(f"Could not read crawl version: {str(e)}")
+            return
+        if version != self.version:
+            previous, self.version = self.version, version
+            if previous is not None:
+                logger.info(f"Crawl version changed to {version}, invalidating answer cache")
+                await self.invalidate()
+
+    async def invalidate(self):
+        """Drop cached answers from other crawl versions.
+
+        The persistent tier is shared by every worker, and each one notices a
+        new version on its own schedule, so answers already written under the
+        current version by faster workers are kept.
+        """
+        self._entries.clear()
+        self.counters['invalidations'] += 1
+        if self.collection is not None:
+            try:
+                await self.collection.delete_many({'version': {'$ne': self.version}})
+            except Exception as e:
+                logger.warning(f"Answer cache invalidation failed: {str(e)}")
+
+    async def get(self, key):
+        await self.refresh_version()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, answer = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+                self.counters['memory_hits'] += 1
+                return answer
+            del self._entries[key]
+            self.counters['expirations'] += 1
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({
+                    '_id': key,
+                    'version': self.version,
+                    'created_at': {'$gt': datetime.utcnow() - timedelta(seconds=self.ttl)}
+                })
+            except Exception as e:
+                logger.warning(f"Answer cache lookup failed: {str(e)}")
+                doc = None
+            if doc:
+                self._store(key, doc['answer'])
+                self.counters['hits'] += 1
+                self.counters['persistent_hits'] += 1
+                return doc['answer']
+
+        self.counters['misses'] += 1
+        return None
+
+    def _store(self, key, answer):
+        self._entries[key] = (time.monotonic() + self.ttl, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    async def set(self, key, answer):
+        self._store(key, answer)
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one(
+                    {'_id': key},
+                    {'answer': answer, 'version': self.version, 'created_at': datetime.utcnow()},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"Answer cache write failed: {str(e)}")
+
+    def stats(self):
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'hit_ratio': self.counters['hits'] / lookups if lookups else 0.0,
+            'crawl_version': self.version
+        }
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import logging
+import os
+
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static_answers.json')
+
+
+class CannedAnswer:
+    """One canned answer in one language, encoded once as the response body"""
+
+    __slots__ = ('text', 'body', 'etag', 'headers')
+
+    def __init__(self, text):
+        self.text = text
+        self.body = json.dumps(
+            {"response": text, "status": "success"}, ensure_ascii=False
+        ).encode('utf-8')
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        self.headers = {'ETag': self.etag, 'Cache-Control': 'no-cache'}
+
+    def to_response(self, if_none_match=None):
+        """Build a response around the pre-encoded body (304 if the client has it)"""
+        if if_none_match == self.etag:
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type='application/json', headers=self.headers)
+
+
+class AnswerRegistry:
+    """Canned answers loaded once from a JSON file of {name: {language: text}}.
+
+    Answers can be changed by editing the file and calling reload() (or
+    restarting); no code changes are needed.
+    """
+
+    def __init__(self, path=DEFAULT_ANSWERS_PATH):
+        self.path = path
+        self.answers = {}
+        self.reload()
+
+    def reload(self):
+        with open(self.path, encoding='utf-8') as f:
+            raw = json.load(f)
+        self.answers = {
+            name: {language: CannedAnswer(text) for language, text in translations.items()}
+            for name, translations in raw.items()
+        }
+        logger.info(f"Loaded {len(self.answers)} canned answers from {self.path}")
+
+    def get(self, name, language='english'):
+        translations = self.answers[name]
+        return translations.get(language) or translations['english']
+
+    def text(self, name, language='english'):
+        return self.get(name, language).text
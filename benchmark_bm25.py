@@ -0,0 +1,68 @@
+"""Benchmark: in-process BM25 retrieval vs the Mongo $text + textScore pipeline.
+
+Builds the BM25 indexes from the scraped `pages`/`passages` collections, runs
+the expanded search terms that chat() produces for common questions through
+both engines, and prints per-query latency and top-5 overlap (shared urls).
+
+    python benchmark_bm25.py --repeat 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from bm25_index import BM25Retriever
+from data_access import UniversityDataStore, BOOSTED_URLS
+
+QUERIES = [
+    "what is the fee for be cse? fees cost payment structure semester annual charges",
+    "tell me about the mba program courses programs degrees offered B.Tech M.Tech MBA MCA BBA BCA Ph.D undergraduate postgraduate",
+    "what courses are offered in cse? courses programs degrees offered B.Tech M.Tech MBA MCA BBA BCA Ph.D undergraduate postgraduate",
+    "what are the admission requirements requirements eligibility criteria admission qualification entrance",
+    "hostel facilities hostel accommodation dormitory residence",
+    "placement record placement job career recruitment company",
+    "scholarship for students scholarship financial aid assistance support",
+    "research centres research project publication journal paper",
+]
+
+
+async def timed(search, terms, repeat):
+    samples = []
+    results = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = await search(terms, limit=5, boost_urls=BOOSTED_URLS)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    data_store = UniversityDataStore.from_env()
+    await data_store.ping()
+    bm25 = BM25Retriever(data_store)
+    start = time.perf_counter()
+    await bm25.load()
+    print(f"Index build: {time.perf_counter() - start:.2f}s for {len(bm25.pages)} pages\n")
+
+    print(f"{'query':<42} {'mongo':>10} {'bm25':>10} {'speedup':>8} {'top-5 overlap':>14}")
+    overlaps = []
+    for query in QUERIES:
+        mongo_time, mongo_results = await timed(data_store.text_search, query, args.repeat)
+        bm25_time, bm25_results = await timed(bm25.text_search, query, args.repeat)
+        mongo_urls = {doc['url'] for doc in mongo_results}
+        bm25_urls = {doc['url'] for doc in bm25_results}
+        overlap = len(mongo_urls & bm25_urls) / max(len(mongo_urls), 1)
+        overlaps.append(overlap)
+        print(f"{query[:40]:<42} {mongo_time * 1e3:8.2f}ms {bm25_time * 1e6:8.1f}us "
+              f"{mongo_time / max(bm25_time, 1e-9):7.0f}x {overlap:13.0%}")
+
+    print(f"\nMean top-5 overlap: {statistics.mean(overlaps):.0%}")
+    data_store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""Micro-benchmark: blocking pymongo vs the async data store under concurrent load.
+
+Runs the same $text search that search_university_data issues from N
+concurrent coroutines for a fixed duration, once with synchronous pymongo
+called on the event loop (the old code path) and once through
+UniversityDataStore, and prints requests/sec and latency percentiles.
+
+Needs a MongoDB with a scraped `pages` collection (run scraper.py first).
+
+    python benchmark_data_access.py --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from pymongo import MongoClient
+
+from data_access import UniversityDataStore
+
+QUERIES = [
+    "fee structure fees cost payment charges amount computer science engineering",
+    "tell me about the mba program courses programs degrees offered",
+    "admission entry application apply entrance requirements eligibility",
+    "hostel accommodation dormitory residence",
+    "placement job career recruitment company",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(search, concurrency, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id):
+        i = worker_id
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await search(QUERIES[i % len(QUERIES)])
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies
+
+
+def report(name, rps, latencies):
+    print(f"{name:<22} {rps:>9.1f} req/s   "
+          f"p50 {percentile(latencies, 50) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms   "
+          f"mean {statistics.mean(latencies) * 1000:7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    uri = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/')
+
+    # Before: synchronous pymongo on the event loop
+    sync_pages = MongoClient(uri)['university_db']['pages']
+
+    async def blocking_search(terms):
+        pipeline = [
+            {"$match": {"$text": {"$search": terms}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+            {"$sort": {"score": -1}},
+            {"$limit": 5}
+        ]
+        return list(sync_pages.aggregate(pipeline))
+
+    # After: the async data store
+    data_store = UniversityDataStore.from_env()
+    await data_store.ping()
+
+    async def async_search(terms):
+        return await data_store.text_search(terms, limit=5)
+
+    print(f"concurrency={args.concurrency} duration={args.duration}s")
+    rps, latencies = await run_load(blocking_search, args.concurrency, args.duration)
+    report("before (pymongo)", rps, latencies)
+    rps, latencies = await run_load(async_search, args.concurrency, args.duration)
+    report("after (data_access)", rps, latencies)
+
+    data_store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
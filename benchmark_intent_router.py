@@ -0,0 +1,74 @@
+"""Benchmark: compiled IntentRouter vs the old chained substring scans in chat().
+
+Times classification of every message in intent_corpus.json, grouped by the
+message's first expected intent, and prints the per-intent mean latency of
+both approaches.
+
+    python benchmark_intent_router.py --repeat 20000
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+
+from intent_router import IntentRouter
+
+# The substring tables chat() used before the router
+LEGACY_VARIATIONS = {
+    'hod': ['hod', 'head'],
+    'greeting': ['hi', 'hai', 'hii', 'hiii', 'hey', 'hei', 'hello', 'helo', 'hllo', 'namaste', 'vanakkam', 'namaskar'],
+    'contact': ['contact', 'contct', 'cotact', 'cantact', 'kontact', 'phone', 'phon', 'fone', 'email', 'e-mail', 'mail', 'adress', 'addres', 'location'],
+    'department': ['department', 'departments'],
+    'faculty': ['faculty', 'professor', 'teacher', 'lecturer', 'staff', 'department head', 'hod', 'dean'],
+    'course': ['course', 'corse', 'cours', 'coarse', 'program', 'programme', 'programm', 'degree', 'dgree'],
+    'admission': ['admission', 'admision', 'addmission', 'admisn', 'admssn', 'entry', 'entery', 'joining'],
+    'requirement': ['requirement', 'requirment', 'requirment', 'eligibility', 'eligable', 'eligible', 'qualification', 'qualify'],
+    'fee': ['fee', 'fees', 'cost', 'payment', 'amount', 'charge', 'price'],
+}
+
+
+def legacy_classify(message):
+    message = message.lower()
+    return {intent for intent, variations in LEGACY_VARIATIONS.items()
+            if any(var in message for var in variations)}
+
+
+def time_per_call(fn, messages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(messages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(os.path.join(os.path.dirname(__file__), 'intent_corpus.json'), encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    start = time.perf_counter()
+    router = IntentRouter()
+    print(f"Router compiled in {(time.perf_counter() - start) * 1e3:.2f}ms\n")
+
+    groups = defaultdict(list)
+    for case in corpus:
+        groups[case['intents'][0] if case['intents'] else 'none'].append(case['message'])
+
+    print(f"{'intent':<14} {'msgs':>5} {'legacy':>10} {'router':>10}")
+    for intent, messages in sorted(groups.items()):
+        legacy = time_per_call(legacy_classify, messages, args.repeat)
+        compiled = time_per_call(router.classify, messages, args.repeat)
+        print(f"{intent:<14} {len(messages):>5} {legacy * 1e6:8.2f}us {compiled * 1e6:8.2f}us")
+
+    messages = [case['message'] for case in corpus]
+    legacy = time_per_call(legacy_classify, messages, args.repeat)
+    compiled = time_per_call(router.classify, messages, args.repeat)
+    print(f"{'all':<14} {len(messages):>5} {legacy * 1e6:8.2f}us {compiled * 1e6:8.2f}us")
+
+
+if __name__ == "__main__":
+    main()
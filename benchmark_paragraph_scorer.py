@@ -0,0 +1,91 @@
+"""Benchmark: shared ParagraphScorer vs the per-paragraph term_matches loop it replaced.
+
+Fetches the pages chat() would score for common questions from the scraped
+`pages` collection, checks both scorers pick the same paragraphs, and prints
+median per-query latency. --seeded uses the load test's synthetic corpus
+instead of MongoDB.
+
+    python benchmark_paragraph_scorer.py --repeat 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from paragraph_scorer import ParagraphScorer
+
+QUERIES = [
+    "what is the fee for be cse? fees cost payment structure semester annual charges",
+    "tell me about the mba program courses programs degrees offered B.Tech M.Tech MBA MCA BBA BCA Ph.D undergraduate postgraduate",
+    "what are the admission requirements requirements eligibility criteria admission qualification entrance",
+    "departments schools faculties computer science engineering cse",
+    "hostel facilities hostel accommodation dormitory residence",
+    "placement record placement job career recruitment company",
+]
+
+
+def legacy_top_paragraphs(docs, search_terms, k=3):
+    """The loop previously copied into search_university_data and chat()"""
+    results = []
+    for doc in docs:
+        relevant_paragraphs = []
+        for para in doc.get('text_content', '').split('\n'):
+            if not para.strip():
+                continue
+            para_lower = para.lower()
+            term_matches = sum(1 for term in search_terms.split() if term in para_lower)
+            if term_matches > 0:
+                relevant_paragraphs.append((para, term_matches / len(search_terms.split())))
+        relevant_paragraphs.sort(key=lambda x: x[1], reverse=True)
+        results.append(relevant_paragraphs[:k])
+    return results
+
+
+def median_time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+async def load_docs(args):
+    if args.seeded:
+        from loadtest import SeededDataStore
+        store = SeededDataStore(latency=0)
+    else:
+        from data_access import UniversityDataStore
+        store = UniversityDataStore.from_env()
+        await store.ping()
+    docs = {query: await store.text_search(query, limit=args.limit) for query in QUERIES}
+    store.close()
+    return docs
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=5, help='pages per query, as in chat()')
+    parser.add_argument('--seeded', action='store_true', help='use the synthetic load test corpus')
+    args = parser.parse_args()
+
+    docs_by_query = await load_docs(args)
+    scorer = ParagraphScorer()
+
+    print(f"{'query':<42} {'pages':>5} {'paras':>6} {'legacy':>10} {'scorer':>10} {'speedup':>8} {'same':>5}")
+    speedups = []
+    for query, docs in docs_by_query.items():
+        paragraphs = sum(doc.get('text_content', '').count('\n') + 1 for doc in docs)
+        same = legacy_top_paragraphs(docs, query) == scorer.top_paragraphs(docs, query)
+        legacy = median_time(lambda: legacy_top_paragraphs(docs, query), args.repeat)
+        vectorized = median_time(lambda: scorer.top_paragraphs(docs, query), args.repeat)
+        speedups.append(legacy / vectorized)
+        print(f"{query[:40]:<42} {len(docs):>5} {paragraphs:>6} {legacy * 1e6:8.1f}us "
+              f"{vectorized * 1e6:8.1f}us {legacy / vectorized:7.1f}x {str(same):>5}")
+
+    print(f"\nMedian speedup: {statistics.median(speedups):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
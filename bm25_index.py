@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+
+from passages import tokenize
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {
+    'a', 'about', 'all', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for',
+    'from', 'give', 'how', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'tell',
+    'that', 'the', 'this', 'to', 'what', 'when', 'where', 'which', 'who', 'with', 'you'
+}
+
+
+def index_terms(text):
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over a list of documents"""
+
+    def __init__(self, docs, text_field, k1=1.5, b=0.75):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for doc_id, doc in enumerate(docs):
+            if doc.get('tokens'):
+                terms = [t for t in doc['tokens'] if t not in STOPWORDS]
+            else:
+                terms = index_terms(f"{doc.get('title', '')} {doc.get(text_field, '')}")
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((doc_id, tf))
+
+        n = len(docs)
+        self.avg_length = sum(self.doc_lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.docs)
+
+    def search(self, query, limit=5, boost=None):
+        """Return (score, doc) pairs for the best matches, highest first.
+
+        `boost(doc)` may return a multiplier applied to each document's score.
+        """
+        scores = defaultdict(float)
+        k1, b, avg = self.k1, self.b, self.avg_length or 1.0
+        for term in set(index_terms(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in plist:
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        if boost is not None:
+            for doc_id in scores:
+                scores[doc_id] *= boost(self.docs[doc_id])
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda x: x[1])
+        return [(score, self.docs[doc_id]) for doc_id, score in best]
+
+
+class BM25Retriever:
+    """Serves the data store's search methods from in-process BM25 indexes.
+
+    Indexes over `pages` and `passages` are built at startup and rebuilt in a
+    worker thread when the scraper records a new crawl version; the new
+    indexes replace the old ones in a single assignment, so searches never
+    see a half-built index.
+    """
+
+    def __init__(self, data_store, reload_interval=60):
+        self.data_store = data_store
+        self.reload_interval = reload_interval
+        self.version = None
+        self.pages = BM25Index([], 'text_content')
+        self.passages = BM25Index([], 'text')
+        self._reload_task = None
+
+    async def load(self):
+        """Fetch the corpus and swap in freshly built indexes"""
+        start = time.perf_counter()
+        version = await self.data_store.get_crawl_version()
+        pages = await self.data_store.pages.find(
+            {}, {'_id': 0, 'url': 1, 'title': 1, 'text_content': 1}
+        ).to_list(length=None)
+        passages = await self.data_store.passages.find(
+            {}, {'_id': 0, 'url': 1, 'title': 1, 'heading': 1, 'text': 1, 'tokens': 1}
+        ).to_list(length=None)
+
+        page_index, passage_index = await asyncio.to_thread(
+            lambda: (BM25Index(pages, 'text_content'), BM25Index(passages, 'text'))
+        )
+        self.pages, self.passages, self.version = page_index, passage_index, version
+        logger.info(f"Built BM25 indexes over {len(page_index)} pages and "
+                    f"{len(passage_index)} passages in {time.perf_counter() - start:.2f}s")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                version = await self.data_store.get_crawl_version()
+                if version != self.version:
+                    logger.info(f"Crawl version changed to {version}, reloading BM25 indexes")
+                    await self.load()
+            except Exception as e:
+                logger.error(f"Error reloading BM25 indexes: {str(e)}")
+
+    def start_watching(self):
+        self._reload_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._reload_task:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+
+    @staticmethod
+    def _with_score(results):
+        return [dict(doc, score=score) for score, doc in results]
+
+    async def text_search(self, search_terms, limit=5, boost_urls=None):
+        boost = None
+        if boost_urls:
+            boost = lambda doc: 2 if doc.get('url', '').lower() in boost_urls else 1
+        return self._with_score(self.pages.search(search_terms, limit, boost))
+
+    async def find_pages(self, search_terms, limit=5):
+        return self._with_score(self.pages.search(search_terms, limit))
+
+    async def search_passages(self, search_terms, limit=30):
+        return self._with_score(self.passages.search(search_terms, limit))
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlFrontier:
+    """Crawl frontier and visited set kept in MongoDB so a crawl can resume.
+
+    Each URL is one document keyed by the URL, in one of the states queued,
+    claimed, done or failed. A claim is a single find_one_and_update, so
+    several crawler processes can share one frontier. A claim that is not
+    completed within `lease` seconds (its process died) is handed out again.
+
+    Discovered URLs and completions are buffered. checkpoint() writes them,
+    links first, so a crash loses at most the work since the last
+    checkpoint and those pages are simply claimed again. URLs whose page
+    could not be stored are queued again instead of completed, and marked
+    failed after `max_write_attempts`.
+    """
+
+    def __init__(self, collection, lease=120.0, owner=None, max_write_attempts=3):
+        self.collection = collection
+        self.lease = lease
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.max_write_attempts = max_write_attempts
+        self._added = []
+        self._finished = {}
+        self._write_failures = {}
+        self._lock = asyncio.Lock()
+        self.counters = {'claimed': 0, 'reclaimed': 0, 'checkpoints': 0, 'requeued': 0}
+
+    @classmethod
+    def from_env(cls, db):
+        return cls(db['crawl_frontier'], lease=float(os.environ.get('CRAWL_LEASE', 120)))
+
+    def ensure_indexes(self):
+        self.collection.create_index([('state', ASCENDING), ('added_at', ASCENDING)])
+
+    async def unfinished(self):
+        """Number of URLs still queued or claimed"""
+        return await asyncio.to_thread(
+            self.collection.count_documents, {'state': {'$in': [QUEUED, CLAIMED]}}
+        )
+
+    async def reset(self):
+        """Forget the previous crawl"""
+        self._added, self._finished = [], {}
+        await asyncio.to_thread(self.collection.delete_many, {})
+
+    def add(self, url):
+        self._added.append(url)
+
+    def complete(self, url, ok=True):
+        self._finished[url] = DONE if ok else FAILED
+
+    def take_completed(self):
+        """Completions recorded so far, for a checkpoint() after the pages they cover are flushed"""
+        completed, self._finished = self._finished, {}
+        return completed
+
+    def _claim(self):
+        now = datetime.now()
+        expired = now - timedelta(seconds=self.lease)
+        return self.collection.find_one_and_update(
+            {'$or': [{'state': QUEUED}, {'state': CLAIMED, 'claimed_at': {'$lt': expired}}]},
+            {'$set': {'state': CLAIMED, 'claimed_by': self.owner, 'claimed_at': now}},
+            sort=[('added_at', ASCENDING)],
+            projection={'state': 1},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    async def claim(self):
+        """Atomically take the oldest queued URL, or None if there is none right now"""
+        doc = await asyncio.to_thread(self._claim)
+        if doc is None and self._added:
+            # Links found by this process are not visible to claims until written
+            await self.flush_added()
+            doc = await asyncio.to_thread(self._claim)
+        if doc is None:
+            return None
+        self.counters['claimed'] += 1
+        if doc['state'] == CLAIMED:
+            self.counters['reclaimed'] += 1
+            logger.warning(f"Reclaimed {doc['_id']} after its lease expired")
+        return doc['_id']
+
+    def _write_added(self, added):
+        now = datetime.now()
+        ops = [UpdateOne({'_id': url}, {'$setOnInsert': {'state': QUEUED, 'added_at': now}}, upsert=True)
+               for url in dict.fromkeys(added)]
+        self.collection.bulk_write(ops, ordered=False)
+
+    def _write_finished(self, finished, requeued):
+        now = datetime.now()
+        ops = [UpdateOne({'_id': url, 'claimed_by': self.owner},
+                         {'$set': {'state': state, 'finished_at': now}})
+               for url, state in finished.items()]
+        ops += [UpdateOne({'_id': url, 'claimed_by': self.owner},
+                          {'$set': {'state': QUEUED}, '$unset': {'claimed_by': '', 'claimed_at': ''}})
+                for url in requeued]
+        self.collection.bulk_write(ops, ordered=False)
+
+    async def flush_added(self):
+        async with self._lock:
+            added, self._added = self._added, []
+            if added:
+                await asyncio.to_thread(self._write_added, added)
+
+    async def checkpoint(self, completed=None, write_failed=()):
+        """Write discovered URLs, then completions.
+
+        `completed` (from take_completed(), default everything recorded so
+        far) must only cover pages already flushed; `write_failed` are URLs
+        whose page writes failed, which are queued again instead. Returns
+        the URLs given up on.
+        """
+        async with self._lock:
+            added, self._added = self._added, []
+            if completed is None:
+                completed = self.take_completed()
+            requeued, given_up = [], []
+            for url in write_failed:
+                # Completed after the flush began: drop that too, it is about to be refetched
+                self._finished.pop(url, None)
+                attempts = self._write_failures[url] = self._write_failures.get(url, 0) + 1
+                if attempts >= self.max_write_attempts:
+                    completed[url] = FAILED
+                    given_up.append(url)
+                    logger.error(f"Giving up on {url} after {attempts} failed writes")
+                else:
+                    completed.pop(url, None)
+                    requeued.append(url)
+            self.counters['requeued'] += len(requeued)
+            if added:
+                await asyncio.to_thread(self._write_added, added)
+            if completed or requeued:
+                await asyncio.to_thread(self._write_finished, completed, requeued)
+            self.counters['checkpoints'] += 1
+            return given_up
+
+    async def close(self):
+        """Checkpoint, then hand back URLs this process claimed but never finished"""
+        await self.checkpoint()
+        result = await asyncio.to_thread(
+            self.collection.update_many,
+            {'state': CLAIMED, 'claimed_by': self.owner},
+            {'$set': {'state': QUEUED}, '$unset': {'claimed_by': '', 'claimed_at': ''}}
+        )
+        if result.modified_count:
+            logger.info(f"Returned {result.modified_count} unfinished URLs to the frontier")
+
+    def stats(self):
+        return {**self.counters, 'buffered_links': len(self._added), 'buffered_completions': len(self._finished)}
@@ -0,0 +1,123 @@
+import logging
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+logger = logging.getLogger(__name__)
+
+# Document in the crawl_state collection that the scraper stamps after each crawl
+CRAWL_STATE_ID = 'pages'
+
+# Pages whose url matches one of these get their text score doubled
+BOOSTED_URLS = ["courses", "admission", "faculty", "departments"]
+
+
+class UniversityDataStore:
+    """Async access to the scraped university data over one bounded connection pool"""
+
+    def __init__(self, uri='mongodb://localhost:27017/', db_name='university_db',
+                 max_pool_size=20, min_pool_size=0, wait_queue_timeout_ms=5000):
+        self.client = AsyncIOMotorClient(
+            uri,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            waitQueueTimeoutMS=wait_queue_timeout_ms
+        )
+        self.db = self.client[db_name]
+        self.pages = self.db['pages']
+        self.passages = self.db['passages']
+        self.crawl_state = self.db['crawl_state']
+        self.answer_cache = self.db['answer_cache']
+
+    @classmethod
+    def from_env(cls):
+        """Build a data store using the MONGODB_* environment settings"""
+        return cls(
+            uri=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/'),
+            db_name=os.environ.get('MONGODB_DB', 'university_db'),
+            max_pool_size=int(os.environ.get('MONGODB_MAX_POOL_SIZE', 20)),
+            min_pool_size=int(os.environ.get('MONGODB_MIN_POOL_SIZE', 0)),
+            wait_queue_timeout_ms=int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 5000))
+        )
+
+    async def ping(self):
+        """Check that the server is reachable"""
+        return await self.client.admin.command('ping')
+
+    async def get_crawl_version(self):
+        """Return the version stamped by the last completed crawl, or None"""
+        doc = await self.crawl_state.find_one({'_id': CRAWL_STATE_ID})
+        return doc.get('version') if doc else None
+
+    async def text_search(self, search_terms, limit=5, boost_urls=None):
+        """Run a $text search over pages, best textScore first.
+
+        When `boost_urls` is given, pages whose lower-cased url is in that
+        list score double.
+        """
+        if boost_urls:
+            score = {
+                "$multiply": [
+                    {"$meta": "textScore"},
+                    {
+                        "$cond": [
+                            {"$in": [{"$toLower": "$url"}, boost_urls]},
+                            2,
+                            1
+                        ]
+                    }
+                ]
+            }
+        else:
+            score = {"$meta": "textScore"}
+
+        pipeline = [
+            {
+                "$match": {
+                    "$text": {"$search": search_terms}
+                }
+            },
+            {
+                "$addFields": {
+                    "score": score
+                }
+            },
+            {
+                "$sort": {"score": -1}
+            },
+            {
+                "$limit": limit
+            }
+        ]
+        return await self.pages.aggregate(pipeline).to_list(length=limit)
+
+    async def find_pages(self, search_terms, limit=5):
+        """Return url, title and text_content of the best $text matches"""
+        cursor = self.pages.find(
+            {"$text": {"$search": search_terms}},
+            {
+                "score": {"$meta": "textScore"},
+                "text_content": 1,
+                "url": 1,
+                "title": 1
+            }
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def search_passages(self, search_terms, limit=30):
+        """Return the best $text matches from the passage index, with their tokens"""
+        cursor = self.passages.find(
+            {"$text": {"$search": search_terms}},
+            {
+                "score": {"$meta": "textScore"},
+                "url": 1,
+                "title": 1,
+                "heading": 1,
+                "text": 1,
+                "tokens": 1
+            }
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    }
+]
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 1024
+}
+
+
+class GeminiClient:
+    """Async Gemini client that keeps one keep-alive connection pool per process"""
+
+    def __init__(self, api_key, model="gemini-2.0-flash", max_connections=64,
+                 max_keepalive=32, max_concurrency=48, timeout=10.0, transport=None):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=GEMINI_BASE_URL,
+            headers={'Content-Type': 'application/json'},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=60.0
+            ),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            transport=transport
+        )
+
+    @classmethod
+    def from_env(cls, api_key, **kwargs):
+        """Build a client using the GEMINI_* environment settings"""
+        return cls(
+            api_key,
+            model=os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash'),
+            max_connections=int(os.environ.get('GEMINI_MAX_CONNECTIONS', 64)),
+            max_keepalive=int(os.environ.get('GEMINI_MAX_KEEPALIVE', 32)),
+            max_concurrency=int(os.environ.get('GEMINI_MAX_CONCURRENCY', 48)),
+            timeout=float(os.environ.get('GEMINI_TIMEOUT', 10)),
+            **kwargs
+        )
+
+    def build_payload(self, prompt):
+        """Build the generateContent request body for a prompt"""
+        return {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "safetySettings": SAFETY_SETTINGS,
+            "generationConfig": GENERATION_CONFIG
+        }
+
+    async def _post(self, prompt):
+        async with self._semaphore:
+            response = await self._client.post(
+                f"/{self.model}:generateContent",
+                params={'key': self.api_key},
+                json=self.build_payload(prompt)
+            )
+        return response
+
+    async def generate(self, prompt, deadline=None):
+        """Send a prompt and return the raw HTTP response.
+
+        `deadline` (seconds) bounds the whole call, including the time spent
+        waiting for a free concurrency slot. Raises asyncio.TimeoutError when
+        it expires.
+        """
+        return await asyncio.wait_for(self._post(prompt), deadline or self.timeout)
+
+    async def stream(self, prompt, deadline=None):
+        """Yield text chunks from streamGenerateContent as they arrive.
+
+        `deadline` (seconds) bounds the whole stream; asyncio.TimeoutError is
+        raised if it expires before the last chunk.
+        """
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + (deadline or self.timeout)
+
+        await asyncio.wait_for(self._semaphore.acquire(), expires_at - loop.time())
+        try:
+            async with self._client.stream(
+                'POST',
+                f"/{self.model}:streamGenerateContent",
+                params={'key': self.api_key, 'alt': 'sse'},
+                json=self.build_payload(prompt)
+            ) as response:
+                response.raise_for_status()
+                lines = response.aiter_lines()
+                while True:
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), expires_at - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    if not line.startswith('data:'):
+                        continue
+                    chunk = json.loads(line[5:])
+                    for candidate in chunk.get('candidates', [])[:1]:
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                yield part['text']
+        finally:
+            self._semaphore.release()
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+
+import httpx
+
+from metrics import gemini_queue_wait
+from prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Priorities, lowest first out of the queue
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+# Responses worth another attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _remaining(loop, expires_at):
+    remaining = expires_at - loop.time()
+    if remaining <= 0:
+        raise asyncio.TimeoutError()
+    return remaining
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units a minute, holding at most `capacity`"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(rate_per_minute / 6.0, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class GeminiScheduler:
+    """Admits Gemini calls under requests- and tokens-per-minute budgets.
+
+    Calls wait in a priority queue (interactive before batch, then FIFO)
+    until both buckets have room; a rate of 0 disables that budget. Failed
+    calls (429, 5xx, timeouts and connection errors) are retried with full
+    jitter exponential backoff, honouring Retry-After, for as long as the
+    caller's deadline allows. Each attempt goes back through the queue.
+    """
+
+    def __init__(self, client, rpm=0, tpm=0, deadline=20.0, expected_output_tokens=300,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.client = client
+        self.deadline = deadline
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.expected_output_tokens = expected_output_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        # Calls inside generate() or stream(): queued, in flight or backing off
+        self.pending = 0
+        self.counters = {'admitted': 0, 'retries': 0, 'rate_limited': 0, 'deadline_exceeded': 0}
+
+    @classmethod
+    def from_env(cls, client):
+        """Build a scheduler using the GEMINI_RPM/GEMINI_TPM/GEMINI_MAX_RETRIES settings"""
+        return cls(
+            client,
+            rpm=int(os.environ.get('GEMINI_RPM', 0)),
+            tpm=int(os.environ.get('GEMINI_TPM', 0)),
+            deadline=float(os.environ.get('GEMINI_DEADLINE', 20)),
+            expected_output_tokens=int(os.environ.get('GEMINI_EXPECTED_OUTPUT_TOKENS', 300)),
+            max_retries=int(os.environ.get('GEMINI_MAX_RETRIES', 3))
+        )
+
+    @property
+    def queue_depth(self):
+        return sum(1 for _, _, future, _ in self._queue if not future.done())
+
+    def _wait_time(self, cost):
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(cost))
+        return wait
+
+    async def _dispatch(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _, _, future, cost = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(cost)
+            if wait > 0:
+                # Wake early if a higher-priority call arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(cost)
+            future.set_result(None)
+
+    async def _admit(self, cost, priority, expires_at):
+        if self.requests is None and self.tokens is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            # First call on this event loop: waiters from any earlier loop can never be woken
+            self._queue = [entry for entry in self._queue if entry[2].get_loop() is loop]
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future, cost))
+        self._wakeup.set()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, expires_at - loop.time())
+        finally:
+            gemini_queue_wait.observe(time.perf_counter() - start, priority=PRIORITY_NAMES.get(priority, priority))
+
+    def _cost(self, prompt):
+        return estimate_tokens(prompt) + self.expected_output_tokens
+
+    def _settle(self, response, cost):
+        """Return over-charged tokens once the real usage is known"""
+        if self.tokens is None:
+            return
+        try:
+            used = response.json().get('usageMetadata', {}).get('totalTokenCount')
+        except Exception:
+            used = None
+        if used is not None and used < cost:
+            self.tokens.give_back(cost - used)
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def generate(self, prompt, priority=INTERACTIVE, deadline=None):
+        """Send a prompt through the queue and return the raw HTTP response.
+
+        Raises asyncio.TimeoutError when `deadline` (seconds, default
+        GEMINI_DEADLINE) runs out while queued or before a usable response;
+        the last failing response is returned when retries are exhausted.
+        """
+        self.pending += 1
+        try:
+            return await self._generate(prompt, priority, deadline)
+        finally:
+            self.pending -= 1
+
+    async def _generate(self, prompt, priority, deadline):
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + (deadline or self.deadline)
+        cost = self._cost(prompt)
+        attempt = 0
+        while True:
+            try:
+                await self._admit(cost, priority, expires_at)
+            except asyncio.TimeoutError:
+                self.counters['deadline_exceeded'] += 1
+                raise
+            self.counters['admitted'] += 1
+            response, error = None, None
+            try:
+                response = await self.client.generate(prompt, deadline=_remaining(loop, expires_at))
+            except (asyncio.TimeoutError, httpx.TransportError) as e:
+                error = e
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                self._settle(response, cost)
+                return response
+            if response is not None and response.status_code == 429:
+                self.counters['rate_limited'] += 1
+
+            delay = self._backoff(attempt, response)
+            if attempt >= self.max_retries or loop.time() + delay >= expires_at:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            self.counters['retries'] += 1
+            reason = f"status {response.status_code}" if response is not None else type(error).__name__
+            logger.warning(f"Gemini call failed ({reason}), retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def stream(self, prompt, priority=INTERACTIVE, deadline=None):
+        """Yield text chunks through the queue; retried only until the first chunk arrives"""
+        self.pending += 1
+        try:
+            async for chunk in self._stream(prompt, priority, deadline):
+                yield chunk
+        finally:
+            self.pending -= 1
+
+    async def _stream(self, prompt, priority, deadline):
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + (deadline or self.deadline)
+        cost = self._cost(prompt)
+        attempt = 0
+        while True:
+            await self._admit(cost, priority, expires_at)
+            self.counters['admitted'] += 1
+            started = False
+            try:
+                async for chunk in self.client.stream(prompt, deadline=_remaining(loop, expires_at)):
+                    started = True
+                    yield chunk
+                return
+            except (asyncio.TimeoutError, httpx.TransportError, httpx.HTTPStatusError) as e:
+                response = getattr(e, 'response', None)
+                retryable = response is None or response.status_code in RETRY_STATUSES
+                if response is not None and response.status_code == 429:
+                    self.counters['rate_limited'] += 1
+                delay = self._backoff(attempt, response)
+                if started or not retryable or attempt >= self.max_retries or loop.time() + delay >= expires_at:
+                    raise
+                attempt += 1
+                self.counters['retries'] += 1
+                logger.warning(f"Gemini stream failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        await self.client.aclose()
+
+    def stats(self):
+        return {**self.counters, 'queue_depth': self.queue_depth, 'pending': self.pending}
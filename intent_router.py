@@ -0,0 +1,101 @@
+import re
+
+# Keywords (including common misspellings) that signal each intent
+INTENT_KEYWORDS = {
+    'greeting': ['hi', 'hai', 'hii', 'hiii', 'hey', 'hei', 'hello', 'helo', 'hllo', 'namaste',
+                 'vanakkam', 'namaskar', 'வணக்கம்', 'नमस्ते', 'नमस्कार', 'నమస్కారం', 'నమస్తే'],
+    'contact': ['contact', 'contacts', 'contct', 'cotact', 'cantact', 'kontact', 'phone', 'phon',
+                'fone', 'email', 'e-mail', 'mail', 'address', 'adress', 'addres', 'location'],
+    'hod': ['hod', 'hods', 'head', 'heads'],
+    'department': ['department', 'departments', 'dept'],
+    'school': ['school', 'schools', 'centre', 'centres', 'center', 'centers'],
+    'faculty': ['faculty', 'faculties', 'professor', 'professors', 'teacher', 'teachers',
+                'lecturer', 'lecturers', 'staff', 'department head', 'hod', 'head', 'dean'],
+    'fee': ['fee', 'fees', 'cost', 'costs', 'payment', 'amount', 'charge', 'charges', 'price'],
+    'course': ['course', 'courses', 'corse', 'cours', 'coarse', 'program', 'programs', 'programme',
+               'programmes', 'programm', 'degree', 'degrees', 'dgree', 'specialization', 'branch'],
+    'admission': ['admission', 'admissions', 'admision', 'addmission', 'admisn', 'admssn', 'entry',
+                  'entery', 'joining', 'application', 'apply', 'entrance'],
+    'requirement': ['requirement', 'requirements', 'requirment', 'eligibility', 'eligable',
+                    'eligible', 'qualification', 'qualify', 'criteria'],
+    'hostel': ['hostel', 'hostels', 'accommodation', 'dormitory', 'residence'],
+    'scholarship': ['scholarship', 'scholarships', 'financial aid', 'assistance', 'support'],
+    'placement': ['placement', 'placements', 'job', 'jobs', 'career', 'recruitment', 'company'],
+    'research': ['research', 'project', 'publication', 'journal', 'paper'],
+    'mba_lateral': ['mba lateral entry', 'mba lateral', 'lateral entry mba'],
+}
+
+# Keywords that name a department
+DEPARTMENT_KEYWORDS = {
+    'cse': ['cse', 'computer'],
+    'ece': ['ece', 'electronics'],
+    'mechanical': ['mechanical'],
+    'civil': ['civil'],
+    'sanskrit': ['sanskrit'],
+    'management': ['management', 'mba'],
+    'science': ['science'],
+}
+
+# Keywords that name a degree level ("be"/"me" only next to a department, so
+# "tell me" or "will be" do not count)
+LEVEL_KEYWORDS = {
+    'bachelor': ['b.e', 'bachelor', 'bachelors', 'be cse', 'be computer'],
+    'master': ['m.e', 'master', 'masters', 'me cse', 'me computer'],
+}
+
+
+class Route:
+    """Everything the router found in one message"""
+
+    __slots__ = ('intents', 'departments', 'levels')
+
+    def __init__(self, intents, departments, levels):
+        self.intents = intents
+        self.departments = departments
+        self.levels = levels
+
+    def __repr__(self):
+        return (f"Route(intents={sorted(self.intents)}, departments={sorted(self.departments)}, "
+                f"levels={sorted(self.levels)})")
+
+
+class IntentRouter:
+    """Classifies a message into all matching intents in a single regex pass.
+
+    All keywords are compiled into one alternation, longest first, anchored on
+    word boundaries so that e.g. "hi" no longer matches inside "this". Each
+    keyword maps to the labels it signals; a multi-word phrase also signals the
+    labels of the keywords it is made of.
+    """
+
+    def __init__(self, intents=INTENT_KEYWORDS, departments=DEPARTMENT_KEYWORDS, levels=LEVEL_KEYWORDS):
+        self.labels = {}
+        for kind, table in (('intent', intents), ('department', departments), ('level', levels)):
+            for name, keywords in table.items():
+                for keyword in keywords:
+                    self.labels.setdefault(keyword.lower(), set()).add((kind, name))
+
+        for keyword, labels in self.labels.items():
+            if ' ' in keyword:
+                for word in keyword.split():
+                    labels |= self.labels.get(word, set())
+
+        alternation = '|'.join(re.escape(k) for k in sorted(self.labels, key=len, reverse=True))
+        # \b does not work for Indic scripts whose words end in combining marks
+        self.pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)')
+
+    def classify(self, message):
+        intents, departments, levels = set(), set(), set()
+        buckets = {'intent': intents, 'department': departments, 'level': levels}
+        for match in self.pattern.finditer(message.lower()):
+            for kind, name in self.labels[match.group(0)]:
+                buckets[kind].add(name)
+        return Route(intents, departments, levels)
+
+
+router = IntentRouter()
+
+
+def classify(message):
+    """Classify a message with the default router"""
+    return router.classify(message)
@@ -0,0 +1,101 @@
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LoadShedder:
+    """Decides when chat should answer from retrieval alone instead of waiting on Gemini.
+
+    Shedding switches on when the Gemini backlog (queued plus in-flight
+    calls) exceeds `max_pending`, or when the share of failed Gemini calls
+    over the last `window` seconds exceeds `max_error_rate` (once at least
+    `min_samples` calls were seen). It switches off after `cooldown`
+    seconds once both are back under half their thresholds. While on, one
+    request in `probe_every` still goes to Gemini so the error rate can
+    recover. `shed` counts requests kept off Gemini, `retrieval_only` those
+    of them answered without a cached answer.
+    """
+
+    def __init__(self, max_pending=64, max_error_rate=0.5, window=30.0, min_samples=10, cooldown=15.0,
+                 probe_every=10):
+        self.max_pending = max_pending
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.probe_every = probe_every
+        self.active = False
+        self._shed_since_probe = 0
+        self._since = 0.0
+        self._outcomes = deque()
+        self._failures = 0
+        self.counters = {'activations': 0, 'shed': 0, 'retrieval_only': 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_pending=int(os.environ.get('SHED_MAX_PENDING', 64)),
+            max_error_rate=float(os.environ.get('SHED_MAX_ERROR_RATE', 0.5)),
+            window=float(os.environ.get('SHED_WINDOW', 30)),
+            cooldown=float(os.environ.get('SHED_COOLDOWN', 15)),
+            probe_every=int(os.environ.get('SHED_PROBE_EVERY', 10))
+        )
+
+    def _expire(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def record(self, ok):
+        """Record the outcome of one Gemini call"""
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        if not ok:
+            self._failures += 1
+        self._expire(now)
+
+    def error_rate(self):
+        self._expire(time.monotonic())
+        if len(self._outcomes) < self.min_samples:
+            return 0.0
+        return self._failures / len(self._outcomes)
+
+    def should_shed(self, pending):
+        """Update the mode for the current Gemini backlog and say whether to skip Gemini"""
+        now = time.monotonic()
+        error_rate = self.error_rate()
+        if not self.active:
+            if pending > self.max_pending or error_rate > self.max_error_rate:
+                self.active = True
+                self._since = now
+                self.counters['activations'] += 1
+                logger.warning(f"Load shedding on: {pending} pending Gemini calls, error rate {error_rate:.0%}")
+        elif (now - self._since >= self.cooldown and pending <= self.max_pending / 2
+              and error_rate <= self.max_error_rate / 2):
+            self.active = False
+            logger.info(f"Load shedding off after {now - self._since:.0f}s")
+        if not self.active:
+            return False
+        if self.probe_every and self._shed_since_probe >= self.probe_every - 1:
+            self._shed_since_probe = 0
+            return False
+        self._shed_since_probe += 1
+        self.counters['shed'] += 1
+        return True
+
+    def record_retrieval_only(self):
+        """Record a shed request answered from its retrieved passages alone"""
+        self.counters['retrieval_only'] += 1
+
+    def stats(self):
+        return {
+            **self.counters,
+            'active': self.active,
+            'error_rate': self.error_rate(),
+            'max_pending': self.max_pending,
+            'max_error_rate': self.max_error_rate
+        }
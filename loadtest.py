@@ -0,0 +1,297 @@
+"""Concurrent load test and benchmark for the chat API.
+
+Drives a mixed workload (canned intents, fee/course RAG questions and
+multilingual messages) from N concurrent workers and reports requests/sec
+and p50/p95/p99 latency, overall and per category.
+
+By default the FastAPI app runs in-process with a deterministic local Gemini
+stand-in (configurable latency) and a seeded in-memory stand-in for MongoDB,
+so results are repeatable and need no network or database. Use --url to load
+a running server instead.
+
+    python loadtest.py --concurrency 50 --requests 2000
+    python loadtest.py --save-baseline benchmark_baseline.json
+    python loadtest.py --baseline benchmark_baseline.json   # exits 1 on regression
+    python loadtest.py --url http://localhost:5003 --concurrency 20
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from passages import build_passages, tokenize
+
+# (category, message, language)
+WORKLOAD = [
+    ('canned', "Hello", "english"),
+    ('canned', "வணக்கம்", "tamil"),
+    ('canned', "नमस्ते", "hindi"),
+    ('canned', "Who is the HOD of CSE?", "english"),
+    ('canned', "Who is the head of Sanskrit department?", "english"),
+    ('canned', "What are the admission contact details?", "english"),
+    ('canned', "Give me the contact information", "telugu"),
+    ('canned', "mba lateral entry fee", "english"),
+    ('rag', "What is the fee for BE CSE?", "english"),
+    ('rag', "What are the fees for all departments?", "english"),
+    ('rag', "What courses are offered in CSE?", "english"),
+    ('rag', "Tell me about the MBA program", "english"),
+    ('rag', "What is the eligibility for admission to ECE?", "english"),
+    ('rag', "Tell me about hostel accommodation", "english"),
+    ('rag', "Placement record of mechanical engineering", "english"),
+    ('multilingual', "Tell me about the MBA program", "tamil"),
+    ('multilingual', "What is the fee for BE CSE?", "hindi"),
+    ('multilingual', "What are the admission requirements?", "telugu"),
+    ('multilingual', "Scholarship for sanskrit students", "tamil"),
+    ('department', "What are the departments available?", "english"),
+    ('department', "Tell me about CSE department", "english"),
+]
+
+# Share of requests per category
+DEFAULT_MIX = {'canned': 0.4, 'rag': 0.35, 'multilingual': 0.15, 'department': 0.1}
+
+DEPARTMENTS = ['computer science engineering', 'electronics communication engineering',
+               'mechanical engineering', 'civil engineering', 'sanskrit vedanta',
+               'management business administration mba', 'physics chemistry mathematics']
+TOPICS = {
+    'Fee Structure': 'The tuition fee for {dept} is Rs {n},000 per year. Other fees and charges apply per semester.',
+    'Courses Offered': 'The {dept} department offers undergraduate and postgraduate programs with {n} seats.',
+    'Admission': 'Admission to {dept} requires eligibility criteria and an entrance test with {n} percent marks.',
+    'Hostel': 'Hostel accommodation for {dept} students costs Rs {n},000 per year including mess.',
+    'Placement': 'Placement record for {dept}: {n} companies visited for recruitment this year.',
+    'Faculty': 'The {dept} faculty includes {n} professors and the head of department.',
+}
+NAVIGATION = 'Home About Admissions Academics Research Placements Contact'
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class SeededDataStore:
+    """In-memory stand-in for UniversityDataStore over a seeded synthetic corpus"""
+
+    def __init__(self, seed=7, pages=300, latency=0.005):
+        rng = random.Random(seed)
+        self.latency = latency
+        self.pages_list, self.passages_list = [], []
+        for i in range(pages):
+            dept = DEPARTMENTS[i % len(DEPARTMENTS)]
+            title = f"{rng.choice(list(TOPICS))} - {dept.title()}"
+            blocks = [('p', NAVIGATION)]
+            for heading, template in rng.sample(list(TOPICS.items()), 3):
+                blocks.append(('h2', heading))
+                blocks.append(('p', template.format(dept=dept, n=rng.randint(10, 99))))
+            url = f"https://kanchiuniv.ac.in/page-{i}/"
+            text = '\n'.join(text for _, text in blocks)
+            self.pages_list.append({'url': url, 'title': title, 'text_content': text,
+                                    'terms': Counter(tokenize(f"{title} {text}"))})
+            for passage in build_passages(blocks, url, title):
+                passage['terms'] = Counter(passage['tokens'])
+                self.passages_list.append(passage)
+
+    async def ping(self):
+        return {'ok': 1}
+
+    async def get_crawl_version(self):
+        return 'loadtest'
+
+    def _search(self, docs, search_terms, limit, fields):
+        terms = set(tokenize(search_terms))
+        scored = []
+        for doc in docs:
+            score = sum(doc['terms'][t] for t in terms)
+            if score:
+                scored.append((score, doc))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [dict({k: doc[k] for k in fields if k in doc}, score=float(score))
+                for score, doc in scored[:limit]]
+
+    async def text_search(self, search_terms, limit=5, boost_urls=None):
+        await asyncio.sleep(self.latency)
+        return self._search(self.pages_list, search_terms, limit, ('url', 'title', 'text_content'))
+
+    async def find_pages(self, search_terms, limit=5):
+        await asyncio.sleep(self.latency)
+        return self._search(self.pages_list, search_terms, limit, ('url', 'title', 'text_content'))
+
+    async def search_passages(self, search_terms, limit=30):
+        await asyncio.sleep(self.latency)
+        return self._search(self.passages_list, search_terms, limit,
+                            ('url', 'title', 'heading', 'text', 'tokens'))
+
+    def close(self):
+        pass
+
+
+def fake_gemini_transport(latency, jitter, seed):
+    """httpx transport answering generateContent/streamGenerateContent deterministically"""
+    rng = random.Random(seed)
+
+    async def handler(request):
+        await asyncio.sleep(max(0.0, rng.gauss(latency, jitter)))
+        prompt = json.loads(request.content)['contents'][0]['parts'][0]['text']
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]
+        text = f"Stand-in answer {digest} for a {len(prompt)} character prompt."
+        chunk = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        if 'streamGenerateContent' in request.url.path:
+            return httpx.Response(200, content=f"data: {json.dumps(chunk)}\r\n\r\n".encode(),
+                                  headers={'content-type': 'text/event-stream'})
+        return httpx.Response(200, json=chunk)
+
+    return httpx.MockTransport(handler)
+
+
+def in_process_client(args):
+    """Import the app with local stand-ins for Gemini and MongoDB"""
+    os.environ.setdefault('GOOGLE_API_KEY', 'loadtest')
+    import server
+    from gemini_client import GeminiClient
+    from semantic_cache import SemanticCache
+
+    store = SeededDataStore(seed=args.seed, latency=args.db_latency)
+    server.init_services(store=store, gemini=GeminiClient.from_env('loadtest', transport=fake_gemini_transport(
+        args.llm_latency, args.llm_jitter, args.seed)))
+    if args.no_cache:
+        server.answer_cache.max_entries = 0
+        server.semantic_cache = SemanticCache(max_entries=0)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app),
+                             base_url='http://loadtest', timeout=60)
+
+
+def build_schedule(total, mix, seed):
+    rng = random.Random(seed)
+    by_category = defaultdict(list)
+    for case in WORKLOAD:
+        by_category[case[0]].append(case)
+    categories = list(mix)
+    weights = [mix[c] for c in categories]
+    return [rng.choice(by_category[rng.choices(categories, weights)[0]]) for _ in range(total)]
+
+
+async def run(client, schedule, concurrency):
+    results = defaultdict(list)
+    errors = Counter()
+    queue = iter(schedule)
+
+    async def worker():
+        for category, message, language in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.post('/api/chat', json={'message': message, 'language': language})
+                ok = response.status_code == 200 and response.json().get('status') == 'success'
+            except Exception:
+                ok = False
+            if ok:
+                results[category].append(time.perf_counter() - start)
+            else:
+                errors[category] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, results, errors
+
+
+def summarize(elapsed, results, errors):
+    def stats(samples):
+        return {
+            'requests': len(samples),
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p95_ms': percentile(samples, 95) * 1000,
+            'p99_ms': percentile(samples, 99) * 1000,
+            'mean_ms': statistics.mean(samples) * 1000 if samples else 0.0,
+        }
+
+    everything = [s for samples in results.values() for s in samples]
+    summary = {'overall': stats(everything), 'categories': {}}
+    summary['overall']['rps'] = len(everything) / elapsed if elapsed else 0.0
+    summary['overall']['errors'] = sum(errors.values())
+    for category, samples in sorted(results.items()):
+        summary['categories'][category] = stats(samples)
+        summary['categories'][category]['errors'] = errors[category]
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'category':<14} {'reqs':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = list(summary['categories'].items()) + [('overall', summary['overall'])]
+    for name, row in rows:
+        print(f"{name:<14} {row['requests']:>6} {row['errors']:>5} {row['p50_ms']:7.1f}ms "
+              f"{row['p95_ms']:7.1f}ms {row['p99_ms']:7.1f}ms")
+    print(f"\nThroughput: {summary['overall']['rps']:.1f} req/s")
+
+
+def compare(summary, baseline, tolerance):
+    """Print the change against a saved baseline; return True if anything regressed"""
+    regressed = False
+    print(f"\nAgainst baseline (tolerance {tolerance:.0%}):")
+    checks = [('rps', summary['overall']['rps'], baseline['overall']['rps'], True)]
+    for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+        checks.append((metric, summary['overall'][metric], baseline['overall'][metric], False))
+    for name, current, before, higher_is_better in checks:
+        change = (current - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        flag = 'REGRESSION' if worse > tolerance else 'ok'
+        regressed = regressed or worse > tolerance
+        print(f"  {name:<7} {before:10.1f} -> {current:10.1f} ({change:+.1%}) {flag}")
+    return regressed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='load a running server instead of the in-process app')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='stand-in Gemini latency (s)')
+    parser.add_argument('--llm-jitter', type=float, default=0.2)
+    parser.add_argument('--db-latency', type=float, default=0.005, help='stand-in Mongo latency (s)')
+    parser.add_argument('--no-cache', action='store_true', help='disable the answer cache')
+    parser.add_argument('--mix', help='category weights, e.g. canned=0.5,rag=0.5')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        mix = {k: float(v) for k, v in (item.split('=') for item in args.mix.split(','))}
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = in_process_client(args)
+
+    schedule = build_schedule(args.requests, mix, args.seed)
+    async with client:
+        elapsed, results, errors = await run(client, schedule, args.concurrency)
+
+    summary = summarize(elapsed, results, errors)
+    summary['config'] = {k: v for k, v in vars(args).items() if k not in ('save_baseline', 'baseline')}
+    print_summary(summary)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(summary, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+
+# Request ID of the request being handled, stamped onto every log record
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+# Longest payload (Gemini responses, search terms) written to the log, and the share of requests that log them
+PAYLOAD_CHARS = int(os.environ.get('LOG_PAYLOAD_CHARS', 200))
+PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def cap_payload(text, limit=None):
+    """Cut a payload to the logging size cap, noting how much was dropped"""
+    limit = PAYLOAD_CHARS if limit is None else limit
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…(+{len(text) - limit} chars)"
+
+
+def sample_payload():
+    """Whether this request should log its payloads"""
+    return random.random() < PAYLOAD_SAMPLE_RATE
+
+
+class RequestIdFilter(logging.Filter):
+    """Copies the current request ID onto the record before it leaves the request's context"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request ID, message and any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def log_file_path(path=None):
+    """LOG_FILE for this process.
+
+    With more than one worker (WEB_CONCURRENCY > 1) each process writes its
+    own file, ".{pid}" being added before the extension unless the path
+    already places "{pid}" itself, so rotations never race.
+    """
+    path = path or os.environ.get('LOG_FILE', 'server.log')
+    if '{pid}' not in path and int(os.environ.get('WEB_CONCURRENCY') or 1) > 1:
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{{pid}}{ext}"
+    return path.replace('{pid}', str(os.getpid()))
+
+
+def configure_logging(path=None, level=logging.INFO):
+    """Log through a queue so callers never wait on console or file I/O.
+
+    Records are stamped with the request ID on the calling side and written
+    by a QueueListener thread: text to stdout and JSON lines to a rotating
+    file (LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT), per process when
+    there are several workers (see log_file_path).
+    """
+    path = log_file_path(path)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s'))
+    log_file = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        backupCount=int(os.environ.get('LOG_BACKUP_COUNT', 5)),
+        encoding='utf-8'
+    )
+    log_file.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    listener = logging.handlers.QueueListener(log_queue, console, log_file, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    return listener
@@ -0,0 +1,138 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond canned answers to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Timings of the current request, read back into its Server-Timing header
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label set"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name, help_text, read, metric_type='gauge'):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.metric_type = metric_type
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}",
+                f"{self.name} {self.read()}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, read, metric_type='gauge'):
+        metric = Gauge(name, help_text, read, metric_type)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'chat_stage_seconds', 'Time spent in each stage of the chat pipeline')
+request_seconds = registry.histogram(
+    'http_request_seconds', 'End-to-end request latency by path')
+prompt_chars = registry.histogram(
+    'chat_prompt_chars', 'Size of the assembled Gemini prompt in characters',
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000))
+gemini_queue_wait = registry.histogram(
+    'gemini_queue_wait_seconds', 'Time Gemini calls waited for rate-limit capacity, by priority')
+
+
+def start_request():
+    """Begin collecting stage timings for the current request"""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(name, elapsed):
+    """Record a pipeline stage into chat_stage_seconds and the request's Server-Timing"""
+    stage_seconds.observe(elapsed, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, elapsed))
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def stage_totals(timings):
+    """Sum [(stage, seconds)] per stage, keeping first-seen order"""
+    totals = {}
+    for name, elapsed in timings:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return totals
+
+
+def server_timing_header(timings):
+    """Render [(stage, seconds)] as a Server-Timing header value (durations in ms)"""
+    return ', '.join(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in stage_totals(timings).items())
@@ -0,0 +1,172 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+from bs4 import NavigableString, Tag
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'share',
+                   'replytocom', 'amp'}
+TRACKING_PREFIXES = ('utm_',)
+
+# WordPress archives that list posts already crawled on their own pages
+ARCHIVE_PATH = re.compile(r'/(tag|author|feed|comments/feed|wp-json)(/|$)|/page/\d+/?$|/trackback/?$')
+ARCHIVE_PARAMS = {'paged', 's', 'tag', 'author', 'feed', 'attachment_id'}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Site chrome repeated on every page, left out of fingerprints
+CHROME_TAGS = {'nav', 'aside', 'form', 'header', 'footer'}
+CHROME_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search'}
+CHROME_NAMES = re.compile(r'^(site-(header|footer|navigation|branding|info)|(main-|primary-)?(menu|navigation|navbar)'
+                          r'|sidebar|widget(-area)?|footer(-widgets)?|breadcrumbs?|top-?bar|copyright|social(-links)?)$')
+
+SIMHASH_BITS = 64
+# Pages with less body text than this are too short to fingerprint reliably; a
+# few sentences in common would otherwise make two short pages look the same
+MIN_SHINGLES = 50
+
+
+def canonicalize_url(url):
+    """Normal form of a URL so variants of one page are fetched and stored once.
+
+    Lower-cases the scheme and host, drops default ports, fragments and
+    tracking parameters, sorts the remaining query, collapses repeated
+    slashes and gives directory-style paths the trailing slash WordPress
+    redirects to (paths ending in a file name keep none). Returns None for
+    a URL that cannot be parsed, such as one with a non-numeric port.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    last_segment = path.rsplit('/', 1)[-1]
+    if last_segment and '.' not in last_segment:
+        path += '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def is_archive_url(url):
+    """Whether a URL is a WordPress tag, author, feed or paged archive"""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    if ARCHIVE_PATH.search(parts.path):
+        return True
+    return any(key in ARCHIVE_PARAMS for key, _ in parse_qsl(parts.query, keep_blank_values=True))
+
+
+def _is_chrome(tag, in_article):
+    if tag.name in CHROME_TAGS:
+        # An article's own header holds its title and date
+        return not (in_article and tag.name in ('header', 'footer'))
+    if tag.get('role') in CHROME_ROLES:
+        return True
+    names = tag.get('class', []) + [tag.get('id') or '']
+    return any(CHROME_NAMES.match(name.lower()) for name in names)
+
+
+def main_text(soup):
+    """Body text of a parsed page without the header, footer, menus and sidebars around it"""
+    root = soup.find('main') or soup.find(attrs={'role': 'main'}) or soup.body or soup
+    parts = []
+    # Iterative walk in document order; page markup can nest deeper than the recursion limit
+    stack = [(iter(root.children), root.name == 'main' or root.get('role') == 'main')]
+    while stack:
+        children, in_article = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+        elif isinstance(child, Tag):
+            if not _is_chrome(child, in_article):
+                stack.append((iter(child.children), in_article or child.name in ('article', 'main')))
+        elif type(child) is NavigableString:
+            # Comments, doctypes and CDATA are NavigableString subclasses
+            text = child.strip()
+            if text:
+                parts.append(text)
+    return ' '.join(parts)
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of the word shingles of a text, or None if it is too short.
+
+    Returned as a signed integer so it fits a MongoDB int64.
+    """
+    words = re.findall(r'\w+', text.lower())
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+         for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(shingles)
+    fingerprint = sum(1 << int(i) for i in np.flatnonzero(votes))
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >= 1 << (SIMHASH_BITS - 1) else fingerprint
+
+
+def hamming_distance(a, b):
+    return ((a ^ b) & ((1 << SIMHASH_BITS) - 1)).bit_count()
+
+
+class NearDuplicateIndex:
+    """Finds pages whose SimHash is within `max_distance` bits of one already seen.
+
+    The fingerprint is split into `max_distance + 1` bands; two fingerprints
+    that close must agree exactly on at least one band, so only pages
+    sharing a band are compared.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        self._bounds = [(SIMHASH_BITS * i // bands, SIMHASH_BITS * (i + 1) // bands) for i in range(bands)]
+        self._buckets = [{} for _ in range(bands)]
+        self._fingerprints = {}
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def _keys(self, fingerprint):
+        unsigned = fingerprint & ((1 << SIMHASH_BITS) - 1)
+        for band, (low, high) in enumerate(self._bounds):
+            yield band, (unsigned >> low) & ((1 << (high - low)) - 1)
+
+    def find(self, fingerprint, url=None):
+        """URL of an indexed near-duplicate other than `url`, or None"""
+        for band, key in self._keys(fingerprint):
+            for other in self._buckets[band].get(key, ()):
+                if other != url and hamming_distance(fingerprint, self._fingerprints[other]) <= self.max_distance:
+                    return other
+        return None
+
+    def add(self, url, fingerprint):
+        self.remove(url)
+        self._fingerprints[url] = fingerprint
+        for band, key in self._keys(fingerprint):
+            self._buckets[band].setdefault(key, []).append(url)
+
+    def remove(self, url):
+        fingerprint = self._fingerprints.pop(url, None)
+        if fingerprint is None:
+            return
+        for band, key in self._keys(fingerprint):
+            self._buckets[band][key].remove(url)
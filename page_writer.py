@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class PageWriteBuffer:
+    """Write-behind buffer for crawled pages.
+
+    Pages, their passages and removals are collected in memory and written
+    as unordered bulk_write batches once `max_batch` pages are waiting or
+    every `flush_interval` seconds, whichever comes first. Writes run in a
+    thread, one batch at a time, so a slow database pushes back on the
+    crawl workers instead of queueing without limit. close() flushes
+    whatever is left. URLs whose writes failed are collected until
+    take_failed(), so the caller can fetch them again.
+    """
+
+    def __init__(self, db, max_batch=200, flush_interval=2.0):
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pages = []
+        self._removed = []
+        self._failed = set()
+        self._lock = asyncio.Lock()
+        self._flusher = None
+        self.counters = {'batches': 0, 'pages': 0, 'passages': 0, 'removed': 0, 'errors': 0,
+                         'write_seconds': 0.0, 'largest_batch': 0}
+
+    @classmethod
+    def from_env(cls, db):
+        return cls(
+            db,
+            max_batch=int(os.environ.get('CRAWL_WRITE_BATCH', 200)),
+            flush_interval=float(os.environ.get('CRAWL_WRITE_INTERVAL', 2.0))
+        )
+
+    def start(self):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so close() never abandons a batch halfway through
+            await asyncio.shield(self.flush())
+
+    async def add(self, url, content, passages):
+        """Queue a page and its passages, flushing if the batch is full"""
+        self._pages.append((url, content, passages))
+        if len(self._pages) >= self.max_batch:
+            await self.flush()
+
+    async def remove(self, url):
+        """Queue the deletion of a page and its passages"""
+        self._removed.append(url)
+        if len(self._removed) >= self.max_batch:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            pages, self._pages = self._pages, []
+            removed, self._removed = self._removed, []
+            if pages or removed:
+                self._failed |= await asyncio.to_thread(self._write, pages, removed)
+
+    def take_failed(self):
+        """URLs whose page, passages or removal were not written since the last call"""
+        failed, self._failed = self._failed, set()
+        return failed
+
+    def _write(self, pages, removed):
+        """Write one batch and return the URLs that failed"""
+        now = datetime.now()
+        page_ops = [UpdateOne({'url': url}, {'$set': content}, upsert=True) for url, content, _ in pages]
+        page_ops += [DeleteOne({'url': url}) for url in removed]
+        urls = [url for url, _, _ in pages] + removed
+        # Old passages must be gone before the new ones land, so deletes and inserts are separate batches
+        delete_ops = [DeleteMany({'url': url}) for url in urls]
+        insert_ops, insert_urls = [], []
+        for url, _, passages in pages:
+            for passage in passages:
+                passage['last_updated'] = now
+                insert_ops.append(InsertOne(passage))
+                insert_urls.append(url)
+
+        failed = set()
+        start = time.perf_counter()
+        for collection, ops, op_urls in ((self.db.pages, page_ops, urls),
+                                         (self.db.passages, delete_ops, urls),
+                                         (self.db.passages, insert_ops, insert_urls)):
+            if not ops:
+                continue
+            try:
+                collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors', [])
+                self.counters['errors'] += len(errors) or 1
+                if errors:
+                    failed.update(op_urls[error['index']] for error in errors)
+                else:
+                    failed.update(op_urls)
+                logger.error(f"Bulk write to {collection.name} partly failed: {str(errors[:3])}")
+            except PyMongoError as e:
+                # Nothing later in the batch can be trusted to land either
+                self.counters['errors'] += 1
+                failed.update(urls)
+                logger.error(f"Bulk write of {len(pages)} pages failed: {str(e)}")
+                break
+        elapsed = time.perf_counter() - start
+
+        self.counters['batches'] += 1
+        self.counters['pages'] += len(pages)
+        self.counters['passages'] += len(insert_ops)
+        self.counters['removed'] += len(removed)
+        self.counters['write_seconds'] += elapsed
+        self.counters['largest_batch'] = max(self.counters['largest_batch'], len(pages) + len(removed))
+        logger.debug(f"Wrote {len(pages)} pages, {len(insert_ops)} passages, {len(removed)} removals "
+                     f"in {elapsed * 1000:.0f}ms, {len(failed)} failed")
+        return failed
+
+    async def close(self):
+        """Stop the periodic flush and write everything still buffered"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush()
+        logger.info(f"Page writes: {self.stats()}")
+
+    def stats(self):
+        batches = self.counters['batches']
+        return {
+            **self.counters,
+            'pending': len(self._pages) + len(self._removed),
+            'failed': len(self._failed),
+            'mean_batch': (self.counters['pages'] + self.counters['removed']) / batches if batches else 0.0,
+            'mean_write_ms': self.counters['write_seconds'] * 1000 / batches if batches else 0.0
+        }
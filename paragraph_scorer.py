@@ -0,0 +1,119 @@
+import bisect
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+
+class PreparedPage:
+    """A page's paragraphs, lower-cased and joined once, with each paragraph's offsets"""
+
+    __slots__ = ('content', 'paragraphs', 'lowered', 'starts', 'ends', 'non_empty', 'term_hits')
+
+    # Distinct search terms whose paragraph hits are remembered per page
+    MAX_TERMS = 1024
+
+    def __init__(self, content):
+        self.content = content
+        self.paragraphs = content.split('\n')
+        lowered = [para.lower() for para in self.paragraphs]
+        self.lowered = '\n'.join(lowered)
+        self.starts, self.ends = [], []
+        offset = 0
+        for para in lowered:
+            self.starts.append(offset)
+            self.ends.append(offset + len(para))
+            offset += len(para) + 1
+        self.non_empty = np.fromiter((bool(para.strip()) for para in self.paragraphs), dtype=bool,
+                                     count=len(self.paragraphs))
+        self.term_hits = {}
+
+    def hits(self, term):
+        """Indices of the paragraphs containing term, computed once per term"""
+        hits = self.term_hits.get(term)
+        if hits is None:
+            found = []
+            position = self.lowered.find(term)
+            while position != -1:
+                index = bisect.bisect_right(self.starts, position) - 1
+                found.append(index)
+                # Only presence counts, so resume at the next paragraph
+                position = self.lowered.find(term, self.ends[index] + 1)
+            if len(self.term_hits) >= self.MAX_TERMS:
+                self.term_hits.clear()
+            hits = self.term_hits[term] = np.array(found, dtype=np.int64)
+        return hits
+
+
+class ParagraphScorer:
+    """Picks the most relevant paragraphs of retrieved pages for the prompt.
+
+    A paragraph scores the share of search terms (repeats included) that
+    occur in it as substrings. Pages are prepared once and kept in an LRU
+    keyed by url, and each page remembers which paragraphs contain each term
+    it has been asked about (the expanded search terms repeat across
+    questions). Per-term hits of every page are summed into one score array
+    with bincount, and each page's top k is
+    chosen with a partial partition instead of a full sort. Ties keep
+    document order.
+    """
+
+    def __init__(self, cache_size=512):
+        self.cache_size = cache_size
+        self._pages = OrderedDict()
+
+    def prepare(self, url, content):
+        page = self._pages.get(url)
+        if page is None or page.content != content:
+            page = PreparedPage(content)
+            self._pages[url] = page
+            while len(self._pages) > self.cache_size:
+                self._pages.popitem(last=False)
+        self._pages.move_to_end(url)
+        return page
+
+    @staticmethod
+    def _top_k(scores, candidates, k):
+        if len(candidates) > k:
+            values = scores[candidates]
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            above = candidates[values > kth]
+            tied = candidates[values == kth][:k - len(above)]
+            candidates = np.concatenate((above, tied))
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def top_paragraphs(self, docs, search_terms, k=3):
+        """For each doc, its top-k [(paragraph, score)] in descending score order"""
+        terms = search_terms.split()
+        pages = [self.prepare(doc.get('url', ''), doc.get('text_content', '')) for doc in docs]
+        if not terms:
+            return [[] for _ in pages]
+
+        offsets = [0]
+        for page in pages:
+            offsets.append(offsets[-1] + len(page.paragraphs))
+        hit_index, hit_weight = [], []
+        for term, count in Counter(terms).items():
+            for page, offset in zip(pages, offsets):
+                hits = page.hits(term)
+                if len(hits):
+                    hit_index.append(hits + offset)
+                    hit_weight.append(np.full(len(hits), count, dtype=np.float64))
+        if not hit_index:
+            return [[] for _ in pages]
+        scores = np.bincount(np.concatenate(hit_index), weights=np.concatenate(hit_weight),
+                             minlength=offsets[-1]) / len(terms)
+
+        results = []
+        for page, offset in zip(pages, offsets):
+            page_scores = scores[offset:offset + len(page.paragraphs)]
+            candidates = np.flatnonzero(page.non_empty & (page_scores > 0))
+            results.append([(page.paragraphs[i], float(page_scores[i]))
+                            for i in self._top_k(page_scores, candidates, k)])
+        return results
+
+
+scorer = ParagraphScorer()
+
+
+def top_paragraphs(docs, search_terms, k=3):
+    return scorer.top_paragraphs(docs, search_terms, k)
@@ -0,0 +1,103 @@
+import re
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Target size of one passage in characters
+MAX_PASSAGE_CHARS = 700
+
+
+def tokenize(text):
+    """Lower-cased word tokens, shared by the scraper and the retrieval code"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def _split_long(text, max_chars):
+    """Split an over-long paragraph on sentence boundaries"""
+    if len(text) <= max_chars:
+        return [text]
+    pieces, current = [], ''
+    for sentence in SENTENCE_RE.split(text):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def build_passages(blocks, url, title, max_chars=MAX_PASSAGE_CHARS):
+    """Group (tag, text) blocks, in document order, into heading-aware passages.
+
+    Each passage carries the nearest preceding heading and the paragraphs under
+    it, packed up to `max_chars`.
+    """
+    passages = []
+    heading = ''
+    buffer = []
+
+    def flush():
+        if buffer:
+            text = '\n'.join(buffer)
+            passages.append({
+                'url': url,
+                'title': title,
+                'heading': heading,
+                'text': text,
+                'tokens': tokenize(f"{heading} {text}"),
+                'position': len(passages),
+                'length': len(text)
+            })
+            buffer.clear()
+
+    for tag, text in blocks:
+        if tag in HEADING_TAGS:
+            flush()
+            heading = text
+            continue
+        for piece in _split_long(text, max_chars):
+            if buffer and sum(len(b) + 1 for b in buffer) + len(piece) > max_chars:
+                flush()
+            buffer.append(piece)
+    flush()
+    return passages
+
+
+def select_passages(candidates, search_terms, top_k=8, char_budget=4000):
+    """Pick the best passages that fit in `char_budget` characters.
+
+    Candidates are ranked by their Mongo textScore weighted by how many of the
+    search terms appear in the precomputed passage tokens.
+    """
+    terms = set(tokenize(search_terms))
+    ranked = []
+    for passage in candidates:
+        tokens = set(passage.get('tokens') or tokenize(passage.get('text', '')))
+        coverage = len(terms & tokens) / len(terms) if terms else 0.0
+        ranked.append((passage.get('score', 1.0) * (1 + coverage), passage))
+    ranked.sort(key=lambda x: x[0], reverse=True)
+
+    selected, used = [], 0
+    for _, passage in ranked:
+        if len(selected) >= top_k:
+            break
+        size = len(passage.get('text', ''))
+        if used + size > char_budget:
+            continue
+        selected.append(passage)
+        used += size
+    return selected
+
+
+def format_passages(passages):
+    """Render selected passages as prompt context"""
+    formatted = ""
+    for passage in passages:
+        source = passage.get('title', '')
+        if passage.get('heading'):
+            source = f"{source} - {passage['heading']}" if source else passage['heading']
+        formatted += f"\n🔍 From {source}:\n{passage['text']}\n"
+    return formatted
@@ -0,0 +1,180 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Rough size of one Gemini token in characters, used to turn token budgets into characters
+CHARS_PER_TOKEN = 4
+
+PROMPT_TEMPLATE = """Based on the following information about SCSVMV University, please answer the question.
+Please provide the answer in {language} language.
+
+Context from the university database:
+{context}
+
+Question: {question}
+
+Answer:"""
+
+# Intents checked in this order to pick the budget for a message
+BUDGET_INTENTS = ['fee', 'course', 'admission', 'requirement', 'faculty', 'department',
+                  'hostel', 'scholarship', 'placement', 'research']
+
+SENTENCE_END_RE = re.compile(r'[.!?](?=\s|$)')
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def parse_budgets(spec):
+    """Parse "fee:600,course:1200" into {'fee': 600, 'course': 1200}"""
+    budgets = {}
+    for item in (spec or '').split(','):
+        if ':' in item:
+            intent, tokens = item.split(':', 1)
+            budgets[intent.strip()] = int(tokens)
+    return budgets
+
+
+def _normalize(text):
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+def _shingles(words, size=3):
+    if len(words) < size:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def truncate_cleanly(text, max_chars):
+    """Cut text to at most max_chars, preferring a sentence end, then a word break"""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 0:
+        return ''
+    cut = text[:max_chars - 1]
+    sentence_ends = [m.end() for m in SENTENCE_END_RE.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] > max_chars // 2:
+        return cut[:sentence_ends[-1]]
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,;:') + '…'
+
+
+class Prompt:
+    """An assembled prompt and what went into it"""
+
+    __slots__ = ('text', 'context', 'budget_tokens', 'passages_used', 'duplicates_dropped', 'truncated')
+
+    def __init__(self, text, context, budget_tokens, passages_used=0, duplicates_dropped=0, truncated=False):
+        self.text = text
+        self.context = context
+        self.budget_tokens = budget_tokens
+        self.passages_used = passages_used
+        self.duplicates_dropped = duplicates_dropped
+        self.truncated = truncated
+
+    @property
+    def chars(self):
+        return len(self.text)
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+class PromptAssembler:
+    """Builds the Gemini prompt from retrieved passages under a per-intent token budget.
+
+    Passages are kept in the order given (select_passages ranks them),
+    paragraphs already seen (exactly or as a near-duplicate, e.g. navigation
+    boilerplate repeated on every page) are dropped, and the last passage
+    that does not fit is cut at a sentence or word boundary. The question is
+    cut to `max_question_chars` and to half the budget, so context always
+    has room.
+    """
+
+    def __init__(self, default_budget=1000, budgets=None, similarity=0.8, min_fragment_chars=200,
+                 max_question_chars=1000):
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self.similarity = similarity
+        self.min_fragment_chars = min_fragment_chars
+        self.max_question_chars = max_question_chars
+
+    def budget_for(self, intents):
+        for intent in BUDGET_INTENTS:
+            if intent in intents and intent in self.budgets:
+                return self.budgets[intent]
+        return self.default_budget
+
+    def _dedupe(self, passages):
+        """Drop repeated paragraphs; returns [(source, text)] and the number dropped"""
+        seen_exact = set()
+        seen_shingles = []
+        kept, dropped = [], 0
+        for passage in passages:
+            paragraphs = []
+            for para in passage.get('text', '').split('\n'):
+                normalized = _normalize(para)
+                if not normalized:
+                    continue
+                if normalized in seen_exact:
+                    dropped += 1
+                    continue
+                shingles = _shingles(normalized.split())
+                if any(len(shingles & other) / len(shingles | other) >= self.similarity
+                       for other in seen_shingles):
+                    dropped += 1
+                    continue
+                seen_exact.add(normalized)
+                seen_shingles.append(shingles)
+                paragraphs.append(para.strip())
+            if paragraphs:
+                source = passage.get('title', '')
+                if passage.get('heading'):
+                    source = f"{source} - {passage['heading']}" if source else passage['heading']
+                kept.append((source, '\n'.join(paragraphs)))
+        return kept, dropped
+
+    def build(self, question, language, passages=None, context_text=None, intents=()):
+        """Assemble the prompt from passages (or a ready context string)"""
+        budget_tokens = self.budget_for(intents)
+        question_limit = min(self.max_question_chars, budget_tokens * CHARS_PER_TOKEN // 2)
+        if len(question) > question_limit:
+            logger.warning(f"Question of {len(question)} chars cut to {question_limit}")
+            question = truncate_cleanly(question, question_limit)
+        overhead = len(PROMPT_TEMPLATE.format(language=language, context='', question=question))
+        available = max(budget_tokens * CHARS_PER_TOKEN - overhead, 0)
+
+        used_passages, dropped, truncated = 0, 0, False
+        if passages:
+            sections, dropped = self._dedupe(passages)
+            context = ''
+            for source, text in sections:
+                header = f"\n🔍 From {source}:\n"
+                remaining = available - len(context) - len(header) - 1
+                if len(text) <= remaining:
+                    context += f"{header}{text}\n"
+                    used_passages += 1
+                    continue
+                truncated = True
+                if remaining >= self.min_fragment_chars:
+                    context += f"{header}{truncate_cleanly(text, remaining)}\n"
+                    used_passages += 1
+                break
+        else:
+            context = context_text or ''
+            if len(context) > available:
+                # Same rule as the passages: a fragment too short to be useful is left out
+                context = truncate_cleanly(context, available) if available >= self.min_fragment_chars else ''
+                truncated = True
+
+        text = PROMPT_TEMPLATE.format(language=language, context=context, question=question)
+        prompt = Prompt(text, context, budget_tokens, used_passages, dropped, truncated)
+        logger.info(f"Assembled prompt: {prompt.chars} chars (~{prompt.tokens} tokens, budget {budget_tokens}), "
+                    f"{used_passages} passages, {dropped} duplicate paragraphs dropped"
+                    f"{', truncated' if truncated else ''}")
+        return prompt
@@ -1,4 +1,7 @@
-import requests
+import argparse
+import asyncio
+import hashlib
+import httpx
 from bs4 import BeautifulSoup
 from pymongo import MongoClient
 import os
@@ -7,7 +10,11 @@ import logging
 from urllib.parse import urljoin, urlparse
 import time
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import uuid
+from crawl_frontier import CrawlFrontier
+from page_dedup import NearDuplicateIndex, canonicalize_url, is_archive_url, main_text, simhash
+from page_writer import PageWriteBuffer
+from passages import HEADING_TAGS, build_passages
 
 # Set up logging
 logging.basicConfig(
@@ -15,6 +22,13 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# httpx logs every request at INFO; the crawler logs its own progress
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Responses that mean a page no longer exists
+GONE_STATUSES = {404, 410}
 
 class UniversityScraper:
     def __init__(self):
@@ -23,38 +37,41 @@ class UniversityScraper:
         self.mongo_client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
         self.db = self.mongo_client['university_db']
         self.visited_urls = set()
-        self.to_visit = set()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
         self.max_retries = 3
         self.retry_delay = 5
+        # Async crawl: pages fetched at once, at once per host, and pause after each fetch per connection
+        self.concurrency = int(os.getenv('CRAWL_CONCURRENCY', 16))
+        self.per_host_limit = int(os.getenv('CRAWL_PER_HOST', 4))
+        self.politeness_delay = float(os.getenv('CRAWL_DELAY', 0.25))
+        # Seconds between frontier checkpoints, and between claim attempts when the frontier is empty
+        self.checkpoint_interval = float(os.getenv('CRAWL_CHECKPOINT_INTERVAL', 10))
+        self.idle_poll = 0.5
+        # Validators and links of pages from earlier crawls, keyed by url
+        self.known_pages = {}
+        # SimHash fingerprints of stored pages; a page this many bits or fewer from one of them is not stored
+        self.near_duplicates = NearDuplicateIndex(int(os.getenv('SIMHASH_MAX_DISTANCE', 3)))
+        self.frontier = CrawlFrontier.from_env(self.db)
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Create the indexes used by passage retrieval"""
+        self.db.passages.create_index('url')
+        self.db.passages.create_index(
+            [('heading', 'text'), ('text', 'text')],
+            weights={'heading': 2, 'text': 1},
+            name='passages_text'
+        )
+        self.frontier.ensure_indexes()
         
     def is_valid_url(self, url):
-        """Check if URL is valid and belongs to the same domain"""
+        """Check if URL is valid, belongs to the same domain and is not a WordPress archive"""
         try:
             parsed = urlparse(url)
             # Allow all URLs from the same domain
-            return parsed.netloc == self.base_domain
+            return parsed.netloc == self.base_domain and not is_archive_url(url)
         except:
             return False
 
-    def get_page(self, url):
-        """Get page content with retry logic"""
-        for attempt in range(self.max_retries):
-            try:
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                logger.warning(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                else:
-                    logger.error(f"Failed to fetch {url} after {self.max_retries} attempts")
-                    return None
-
     def extract_content(self, soup, url):
         """Extract relevant content from the page"""
         # Remove unwanted elements
@@ -93,8 +110,12 @@ class UniversityScraper:
         # Extract links
         for link in soup.find_all('a', href=True):
             href = link['href']
-            absolute_url = urljoin(url, href)
-            if self.is_valid_url(absolute_url):
+            try:
+                absolute_url = canonicalize_url(urljoin(url, href))
+            except ValueError:
+                # urljoin rejects malformed hosts such as an unclosed IPv6 bracket
+                continue
+            if absolute_url and self.is_valid_url(absolute_url):
                 content['links'].append({
                     'url': absolute_url,
                     'text': link.get_text(strip=True)
@@ -102,69 +123,287 @@ class UniversityScraper:
         
         return content
 
-    def process_page(self, url):
-        """Process a single page"""
-        if url in self.visited_urls:
-            return
-            
-        logger.info(f"Processing: {url}")
-        self.visited_urls.add(url)
-        
-        html_content = self.get_page(url)
-        if not html_content:
-            return
-            
+    def iter_blocks(self, soup):
+        """Yield (tag, text) for headings and paragraphs in document order"""
+        for element in soup.find_all(HEADING_TAGS + ['p']):
+            text = element.get_text(' ', strip=True)
+            if text:
+                yield element.name, text
+
+    def parse_page(self, url, html_content):
+        """Extract the page document and its passages from HTML"""
         soup = BeautifulSoup(html_content, 'lxml')
         content = self.extract_content(soup, url)
-        
-        # Store in MongoDB
-        self.db.pages.update_one(
-            {'url': url},
-            {'$set': content},
+        passages = build_passages(self.iter_blocks(soup), url, content['title'])
+        # Fingerprint the page body, not the navigation and footer repeated on every page
+        content['simhash'] = simhash(main_text(soup))
+        return content, passages
+
+    def load_known_pages(self):
+        """Load the validators, fingerprints and links stored by earlier crawls"""
+        projection = {'_id': 0, 'url': 1, 'etag': 1, 'last_modified': 1, 'content_hash': 1, 'simhash': 1,
+                      'links.url': 1}
+        self.known_pages = {doc['url']: doc for doc in self.db.pages.find({}, projection)}
+        for url, doc in self.known_pages.items():
+            if doc.get('simhash') is not None:
+                self.near_duplicates.add(url, doc['simhash'])
+        logger.info(f"Loaded {len(self.known_pages)} known pages")
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a page seen before"""
+        known = self.known_pages.get(url, {})
+        headers = {}
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+        return headers
+
+    async def fetch_page(self, client, url, headers=None):
+        """Get a page with retry logic, without blocking the event loop.
+
+        Returns the response, including 304 Not Modified and 404/410 answers,
+        or None when every attempt failed.
+        """
+        for attempt in range(self.max_retries):
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code == 304 or response.status_code in GONE_STATUSES:
+                    return response
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                logger.warning(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    logger.error(f"Failed to fetch {url} after {self.max_retries} attempts")
+                    return None
+
+    async def crawl_async(self, start_url=None, incremental=False, restart=False):
+        """Crawl from the persistent frontier, resuming an unfinished crawl.
+
+        `concurrency` workers claim URLs from the frontier as soon as they
+        are free; at most `per_host_limit` of them talk to a host at once
+        and each waits `politeness_delay` after its fetch before letting the
+        next one in. Parsing runs in threads and pages are written in
+        unordered batches through a PageWriteBuffer, so fetches keep
+        flowing. Every `checkpoint_interval` seconds buffered pages are
+        written, then the frontier is checkpointed. A fresh crawl starts
+        only when the frontier is empty or `restart` is set.
+
+        With `incremental`, every known page is revisited with a conditional
+        GET; pages answering 304 or with an unchanged content hash are not
+        parsed or written, and their stored links feed the frontier. Pages
+        answering 404/410 are removed either way.
+        """
+        frontier = self.frontier
+        host_slots = {}
+        seen = set()
+        in_flight = 0
+        started = time.perf_counter()
+        stats = {'fetched': 0, 'failed': 0, 'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'duplicates': 0}
+        # Stats counter each buffered write was counted under, taken back if the write fails
+        counted = {}
+        await asyncio.to_thread(self.load_known_pages)
+        writer = PageWriteBuffer.from_env(self.db)
+
+        # Pages stored under a URL that is no longer canonical, or is now skipped as an archive
+        for url in [url for url in self.known_pages if canonicalize_url(url) != url or not self.is_valid_url(url)]:
+            del self.known_pages[url]
+            self.near_duplicates.remove(url)
+            await writer.remove(url)
+            stats['removed'] += 1
+            counted[url] = 'removed'
+
+        def enqueue(url):
+            url = canonicalize_url(url)
+            if url and url not in seen and self.is_valid_url(url):
+                seen.add(url)
+                frontier.add(url)
+
+        async def visit(client, url):
+            """Fetch and store one page; False if it could not be fetched"""
+            host = urlparse(url).netloc
+            slots = host_slots.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+            known = self.known_pages.get(url)
+            headers = self.conditional_headers(url) if incremental else None
+            async with slots:
+                logger.info(f"Processing: {url}")
+                response = await self.fetch_page(client, url, headers)
+                await asyncio.sleep(self.politeness_delay)
+            if response is None:
+                return False
+            stats['fetched'] += 1
+            if stats['fetched'] % 50 == 0:
+                elapsed = time.perf_counter() - started
+                logger.info(f"Processed {stats['fetched']} pages ({stats['fetched'] / elapsed:.1f} pages/sec)")
+            if response.status_code in GONE_STATUSES:
+                if known:
+                    await writer.remove(url)
+                    stats['removed'] += 1
+                    counted[url] = 'removed'
+                return True
+
+            content_hash = hashlib.sha256(response.content).hexdigest() if response.status_code != 304 else None
+            unchanged = known and (response.status_code == 304 or content_hash == known.get('content_hash'))
+            if unchanged and incremental:
+                stats['unchanged'] += 1
+                for link in known.get('links', []):
+                    enqueue(link['url'])
+                return True
+
+            content, passages = await asyncio.to_thread(self.parse_page, url, response.text)
+            for link in content['links']:
+                enqueue(link['url'])
+
+            fingerprint = content['simhash']
+            original = self.near_duplicates.find(fingerprint, url) if fingerprint is not None else None
+            if original:
+                logger.info(f"Skipping {url}: near-duplicate of {original}")
+                self.near_duplicates.remove(url)
+                if known:
+                    # Only dropping a stored copy changes what is served
+                    await writer.remove(url)
+                    counted[url] = 'removed'
+                    stats['removed'] += 1
+                else:
+                    stats['duplicates'] += 1
+                return True
+            if fingerprint is not None:
+                self.near_duplicates.add(url, fingerprint)
+            if unchanged:
+                counted[url] = 'unchanged'
+            else:
+                counted[url] = 'changed' if known else 'new'
+            stats[counted[url]] += 1
+
+            content['etag'] = response.headers.get('etag')
+            content['last_modified'] = response.headers.get('last-modified')
+            content['content_hash'] = content_hash
+            await writer.add(url, content, passages)
+            return True
+
+        async def checkpoint(completed):
+            """Flush buffered pages, then record in the frontier which were written"""
+            await writer.flush()
+            failed = writer.take_failed()
+            for url in failed:
+                # Fetched again (or given up), so neither its count nor its fingerprint stands
+                if url in counted:
+                    stats[counted.pop(url)] -= 1
+                self.near_duplicates.remove(url)
+            stats['failed'] += len(await frontier.checkpoint(completed, failed))
+
+        async def worker(client):
+            nonlocal in_flight
+            while True:
+                url = await frontier.claim()
+                if url is None:
+                    await asyncio.sleep(self.idle_poll)
+                    continue
+                self.visited_urls.add(url)
+                seen.add(url)
+                in_flight += 1
+                try:
+                    ok = await visit(client, url)
+                except Exception as e:
+                    ok = False
+                    logger.error(f"Error processing page {url}: {str(e)}")
+                finally:
+                    in_flight -= 1
+                if not ok:
+                    stats['failed'] += 1
+                # Not reached when cancelled, so close() hands the URL back
+                frontier.complete(url, ok)
+
+        remaining = await frontier.unfinished()
+        if remaining and not restart:
+            logger.info(f"Resuming crawl with {remaining} URLs left in the frontier")
+        else:
+            await frontier.reset()
+            enqueue(start_url or self.base_url)
+            if incremental:
+                for url in self.known_pages:
+                    enqueue(url)
+            await frontier.flush_added()
+
+        async with httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=30,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency)
+        ) as client:
+            writer.start()
+            workers = [asyncio.create_task(worker(client)) for _ in range(self.concurrency)]
+            try:
+                last_checkpoint = time.monotonic()
+                while True:
+                    await asyncio.sleep(self.idle_poll)
+                    if in_flight and time.monotonic() - last_checkpoint < self.checkpoint_interval:
+                        continue
+                    # Completions are taken before the flush so each one's page is in it
+                    await checkpoint(frontier.take_completed())
+                    last_checkpoint = time.monotonic()
+                    if not in_flight and not await frontier.unfinished():
+                        break
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await checkpoint(frontier.take_completed())
+                await writer.close()
+                await frontier.close()
+
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = elapsed
+        stats['pages_per_sec'] = stats['fetched'] / elapsed if elapsed else 0.0
+        stats['writes'] = writer.stats()
+        logger.info(f"Crawled {stats['fetched']} pages in {elapsed:.1f}s ({stats['pages_per_sec']:.1f} pages/sec), "
+                    f"{stats['failed']} failed")
+        logger.info(f"Pages: {stats['new']} new, {stats['changed']} changed, "
+                    f"{stats['unchanged']} unchanged, {stats['removed']} removed, "
+                    f"{stats['duplicates']} near-duplicates skipped")
+        return stats
+
+    @staticmethod
+    def pages_changed(stats):
+        """Whether a crawl added, rewrote or removed stored pages"""
+        return bool(stats['new'] or stats['changed'] or stats['removed'])
+
+    def crawl(self, start_url=None, incremental=False, restart=False):
+        return asyncio.run(self.crawl_async(start_url, incremental, restart))
+
+    def record_crawl_version(self):
+        """Stamp a new crawl version so servers drop answers cached from the old data"""
+        version = uuid.uuid4().hex
+        self.db.crawl_state.update_one(
+            {'_id': 'pages'},
+            {'$set': {'version': version, 'finished_at': datetime.now()}},
             upsert=True
         )
-        
-        # Add new links to visit
-        for link in content['links']:
-            new_url = link['url']
-            if new_url not in self.visited_urls and new_url not in self.to_visit:
-                self.to_visit.add(new_url)
-
-    def crawl(self, start_url=None):
-        if not start_url:
-            start_url = self.base_url
-            
-        self.to_visit.add(start_url)
-        processed_count = 0
-        
-        while self.to_visit:
-            # Process multiple pages concurrently
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                futures = []
-                for url in list(self.to_visit)[:10]:  # Process up to 10 URLs at a time
-                    self.to_visit.remove(url)
-                    futures.append(executor.submit(self.process_page, url))
-                
-                for future in as_completed(futures):
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logger.error(f"Error processing page: {str(e)}")
-            
-            processed_count += 10
-            logger.info(f"Processed {processed_count} pages. {len(self.to_visit)} pages remaining.")
-            
-            # Be nice to the server
-            time.sleep(1)
+        logger.info(f"Recorded crawl version {version}")
+        return version
 
     def get_all_data(self):
         """Retrieve all scraped data from MongoDB"""
         return list(self.db.pages.find({}, {'_id': 0}))
 
 def main():
+    parser = argparse.ArgumentParser(description="Crawl the university site into MongoDB")
+    parser.add_argument('--incremental', action='store_true',
+                        help='revisit known pages with conditional GETs and only rewrite pages that changed')
+    parser.add_argument('--restart', action='store_true',
+                        help='start a new crawl even if the previous one did not finish')
+    args = parser.parse_args()
+
     scraper = UniversityScraper()
     logger.info("Starting scraping process...")
-    scraper.crawl()
+    stats = scraper.crawl(incremental=args.incremental, restart=args.restart)
+    if scraper.pages_changed(stats) or not args.incremental:
+        scraper.record_crawl_version()
+    else:
+        logger.info("No pages changed, keeping the current crawl version")
     logger.info("Scraping completed!")
     
     # Print summary
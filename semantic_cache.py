@@ -0,0 +1,141 @@
+import logging
+import time
+import zlib
+
+import numpy as np
+
+from bm25_index import index_terms
+
+logger = logging.getLogger(__name__)
+
+
+def embed(text, dim=2048, ngram_sizes=(3, 4, 5)):
+    """Hashed character n-gram vector of a question, L2-normalized.
+
+    Stopwords are dropped, plurals folded and each word wrapped in boundary
+    markers, so "what is the cse fee" and "fees for cse" get the same n-grams
+    regardless of word order.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in index_terms(text):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        padded = f"<{word}>"
+        for n in ngram_sizes:
+            for i in range(max(len(padded) - n + 1, 1)):
+                vector[zlib.crc32(padded[i:i + n].encode('utf-8')) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+class SemanticCache:
+    """Answer cache that also matches reworded questions.
+
+    Questions are embedded with `embed` into rows of one preallocated matrix;
+    a lookup is a single matrix-vector product over the live rows in the same
+    scope (language and routed intents/departments/levels) followed by
+    argmax, accepted when the cosine similarity reaches `threshold`. Entries are
+    dropped when the crawl version changes, and the least recently used row
+    is reused when the matrix is full. A scope keeps its id only while a row
+    uses it, so free-form scope values (the language) cannot grow the map
+    past `max_entries`.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, threshold=0.85, dim=2048):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.dim = dim
+        self.version = None
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._scopes = np.full(max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._answers = [None] * max_entries
+        self._scope_ids = {}
+        self._scope_names = {}
+        self._next_scope_id = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.version is not None:
+                self.invalidate()
+            self.version = version
+
+    def invalidate(self):
+        """Drop every cached answer"""
+        self._scopes.fill(-1)
+        self._answers = [None] * self.max_entries
+        self._scope_ids.clear()
+        self._scope_names.clear()
+        self.counters['invalidations'] += 1
+
+    def get(self, question, scope, version=None):
+        """Return the answer to the most similar cached question in `scope`, or None"""
+        self._check_version(version)
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None or not self.max_entries:
+            self.counters['misses'] += 1
+            return None
+
+        now = time.monotonic()
+        rows = np.flatnonzero((self._scopes == scope_id) & (self._expires > now))
+        if not len(rows):
+            self.counters['misses'] += 1
+            return None
+        similarities = self._vectors[rows] @ embed(question, self.dim)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.counters['misses'] += 1
+            return None
+
+        slot = rows[best]
+        self._last_used[slot] = now
+        self.counters['hits'] += 1
+        logger.info(f"Semantic cache hit (similarity {similarities[best]:.3f})")
+        return self._answers[slot]
+
+    def set(self, question, scope, answer, version=None):
+        self._check_version(version)
+        if not self.max_entries:
+            return
+        now = time.monotonic()
+        free = np.flatnonzero((self._scopes == -1) | (self._expires <= now))
+        if len(free):
+            slot = int(free[0])
+        else:
+            slot = int(np.argmin(self._last_used))
+            self.counters['evictions'] += 1
+        self._release(slot)
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None:
+            scope_id = self._scope_ids[scope] = self._next_scope_id
+            self._scope_names[scope_id] = scope
+            self._next_scope_id += 1
+        self._vectors[slot] = embed(question, self.dim)
+        self._scopes[slot] = scope_id
+        self._expires[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self._answers[slot] = answer
+
+    def _release(self, slot):
+        """Empty a row, forgetting its scope if no other row uses it"""
+        scope_id = self._scopes[slot]
+        self._scopes[slot] = -1
+        self._answers[slot] = None
+        if scope_id != -1 and not np.any(self._scopes == scope_id):
+            del self._scope_ids[self._scope_names.pop(int(scope_id))]
+
+    def stats(self):
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'size': int(np.count_nonzero((self._scopes != -1) & (self._expires > time.monotonic()))),
+            'max_entries': self.max_entries,
+            'scopes': len(self._scope_ids),
+            'threshold': self.threshold,
+            'hit_ratio': self.counters['hits'] / lookups if lookups else 0.0
+        }
@@ -1,83 +1,69 @@
-from fastapi import FastAPI, HTTPException
+import time
+# Cold start is measured from here: imports, worker init and warm-up
+BOOT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import os
-from pymongo import MongoClient
 from dotenv import load_dotenv
-import requests
-from typing import Optional
+import httpx
+from pymongo.errors import ConnectionFailure
+from typing import List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import logging
-import sys
 import re
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('server.log')
-    ]
-)
+from gemini_client import GeminiClient
+from gemini_scheduler import GeminiScheduler, INTERACTIVE, BATCH
+from load_shedder import LoadShedder
+from data_access import UniversityDataStore, BOOSTED_URLS
+from answer_cache import AnswerCache
+from semantic_cache import SemanticCache
+from passages import select_passages
+from paragraph_scorer import top_paragraphs
+from bm25_index import BM25Retriever
+from intent_router import classify
+from prompt_builder import PromptAssembler, parse_budgets
+from singleflight import SingleFlight
+from metrics import (registry as metrics_registry, stage, record_stage, start_request,
+                     server_timing_header, stage_totals, request_seconds, prompt_chars)
+from answer_registry import AnswerRegistry, DEFAULT_ANSWERS_PATH
+from log_config import configure_logging, request_id_var, new_request_id, cap_payload, sample_payload
+
+# Configure logging: a background thread does the console and file writes
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Configure Google Gemini
+# Configure Google Gemini (a missing key is reported by /readyz rather than failing the import)
 api_key = os.environ.get('GOOGLE_API_KEY')
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables")
-
-logger.info("Configuring Gemini API...")
 
 class ChatRequest(BaseModel):
     message: str
     language: str = "english"
 
-def generate_with_gemini(prompt: str) -> str:
-    # Using gemini-2.0-flash model
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    headers = {
-        'Content-Type': 'application/json'
-    }
-    data = {
-        "contents": [{
-            "parts":[{"text": prompt}]
-        }],
-        "safetySettings": [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            }
-        ],
-        "generationConfig": {
-            "temperature": 0.7,
-            "topK": 40,
-            "topP": 0.95,
-            "maxOutputTokens": 1024
-        }
-    }
-    
+async def generate_with_gemini(prompt: str, cache_key: Optional[str] = None,
+                               semantic_key: Optional[Tuple[str, str]] = None,
+                               priority: int = INTERACTIVE) -> str:
+    if cache_key:
+        cached = await answer_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Answer cache hit")
+            return cached
+
     try:
         logger.info(f"Sending request to Gemini API with prompt length: {len(prompt)}")
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        with stage('gemini'):
+            response = await gemini_scheduler.generate(prompt, priority=priority)
         
-        # Log the raw response for debugging
-        logger.info(f"Raw response: {response.text[:500]}")
+        # Log a sample of raw responses for debugging
+        if sample_payload():
+            logger.info(f"Raw response: {cap_payload(response.text)}")
         
         response.raise_for_status()
         
@@ -87,25 +73,92 @@ def generate_with_gemini(prompt: str) -> str:
         if 'candidates' in result and len(result['candidates']) > 0:
             text = result['candidates'][0]['content']['parts'][0]['text']
             logger.info(f"Generated response length: {len(text)}")
+            load_shedder.record(True)
+            if cache_key:
+                await answer_cache.set(cache_key, text)
+            if semantic_key:
+                semantic_cache.set(*semantic_key, text, version=answer_cache.version)
             return text
         else:
             logger.warning("No valid response in Gemini API result")
             return "I apologize, but I couldn't generate a response. Please try again in a moment."
             
-    except requests.exceptions.Timeout:
+    except (asyncio.TimeoutError, httpx.TimeoutException):
         logger.error("Timeout error calling Gemini API")
+        load_shedder.record(False)
         return "I apologize, but the response is taking too long. Please try again."
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Network error calling Gemini API: {str(e)}")
+        load_shedder.record(False)
         return "I apologize, but I'm having trouble connecting to the AI service. Please try again in a moment."
     except Exception as e:
         logger.error(f"Error calling Gemini API: {str(e)}")
         return "I apologize, but something went wrong. Please try again later."
 
+async def stream_with_gemini(prompt: str, cache_key: Optional[str] = None,
+                             semantic_key: Optional[Tuple[str, str]] = None):
+    """Yield the answer in chunks as Gemini produces it (or all at once from the cache)"""
+    if cache_key:
+        cached = await answer_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Answer cache hit")
+            yield cached
+            return
+
+    chunks = []
+    try:
+        logger.info(f"Streaming request to Gemini API with prompt length: {len(prompt)}")
+        async for chunk in gemini_scheduler.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        logger.error("Timeout error streaming from Gemini API")
+        load_shedder.record(False)
+        yield "I apologize, but the response is taking too long. Please try again."
+        return
+    except httpx.HTTPError as e:
+        logger.error(f"Network error streaming from Gemini API: {str(e)}")
+        load_shedder.record(False)
+        yield "I apologize, but I'm having trouble connecting to the AI service. Please try again in a moment."
+        return
+    except Exception as e:
+        logger.error(f"Error streaming from Gemini API: {str(e)}")
+        yield "I apologize, but something went wrong. Please try again later."
+        return
+
+    if not chunks:
+        logger.warning("No valid response in Gemini API stream")
+        yield "I apologize, but I couldn't generate a response. Please try again in a moment."
+        return
+
+    text = ''.join(chunks)
+    logger.info(f"Streamed response length: {len(text)}")
+    load_shedder.record(True)
+    if cache_key:
+        await answer_cache.set(cache_key, text)
+    if semantic_key:
+        semantic_cache.set(*semantic_key, text, version=answer_cache.version)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Give each worker its own clients and caches; warm-up runs in the background behind /readyz"""
+    init_services()
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    # Requests whose callers disconnected keep running in their shared task; let them finish
+    await chat_flights.wait(SHUTDOWN_DRAIN_TIMEOUT)
+    if isinstance(retriever, BM25Retriever):
+        await retriever.stop_watching()
+    await gemini_scheduler.aclose()
+    data_store.close()
+    logger.info("Worker shut down cleanly")
+
 app = FastAPI(
     title="SCSVMV University AI Assistant API",
     description="AI-powered assistant for SCSVMV University information",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -117,17 +170,182 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MongoDB client
-try:
-    mongo_client = MongoClient('mongodb://localhost:27017/')
-    db = mongo_client['university_db']
-    pages_collection = db['pages']
-    # Test the connection
-    mongo_client.server_info()
-    logger.info("Successfully connected to MongoDB")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {str(e)}")
-    raise
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    request_id = request.headers.get('x-request-id') or new_request_id()
+    request_id_var.set(request_id)
+    timings = start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get('route')
+    path = route.path if route else 'unmatched'
+    request_seconds.observe(elapsed, path=path)
+    response.headers['X-Request-ID'] = request_id
+    if timings:
+        response.headers['Server-Timing'] = f"{server_timing_header(timings)}, total;dur={elapsed * 1000:.2f}"
+    logger.info(f"{request.method} {path} {response.status_code} in {elapsed * 1000:.1f}ms", extra={
+        'path': path,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 2),
+        'stage_ms': {name: round(seconds * 1000, 2) for name, seconds in stage_totals(timings).items()}
+    })
+    return response
+
+# Retrieval engine: "mongo" runs $text queries, "bm25" serves them from in-process indexes
+RETRIEVAL_ENGINE = os.environ.get('RETRIEVAL_ENGINE', 'mongo').lower()
+
+# Seconds a stopping worker waits for in-flight chat work before closing its clients
+SHUTDOWN_DRAIN_TIMEOUT = int(os.environ.get('SHUTDOWN_DRAIN_TIMEOUT', 30))
+
+# Cold start above this many seconds is logged as a warning
+COLD_START_TARGET = float(os.environ.get('COLD_START_TARGET', 2.0))
+
+# Seconds /readyz waits for a MongoDB ping
+READINESS_PING_TIMEOUT = float(os.environ.get('READINESS_PING_TIMEOUT', 1.0))
+
+# Warm-up errors that can clear on their own (MongoDB unreachable or restarting); anything else stops warm-up
+WARM_UP_TRANSIENT_ERRORS = (ConnectionFailure, asyncio.TimeoutError, OSError)
+
+# Warm-up progress reported by /readyz: each check is "pending", "ok", "disabled", "missing" or "error: ..."
+startup_state = {
+    'checks': {'mongo': 'pending', 'cache_indexes': 'pending', 'bm25_index': 'pending',
+               'gemini_api_key': 'ok' if api_key else 'missing'},
+    'ready': False,
+    'cold_start_seconds': None,
+    'last_error': None
+}
+
+# Per-worker clients and caches, created by init_services() in the lifespan hook
+data_store: Optional[UniversityDataStore] = None
+retriever = None
+gemini_scheduler: Optional[GeminiScheduler] = None
+answer_cache: Optional[AnswerCache] = None
+semantic_cache: Optional[SemanticCache] = None
+
+# In-flight chat requests keyed by normalized message and language
+chat_flights = SingleFlight()
+
+# In-flight retrievals keyed by search terms, shared by questions that expand to the same terms
+retrieval_flights = SingleFlight()
+
+# Answers from retrieval alone while Gemini is backed up or failing (SHED_* settings)
+load_shedder = LoadShedder.from_env()
+
+# Batch requests: items per call and Gemini calls in flight across all batches, so
+# bulk jobs leave room in the Gemini pool for interactive chat
+CHAT_BATCH_MAX_ITEMS = int(os.environ.get('CHAT_BATCH_MAX_ITEMS', 50))
+batch_gemini_slots = asyncio.Semaphore(int(os.environ.get('CHAT_BATCH_GEMINI_CONCURRENCY', 8)))
+
+# Prompt assembly: token budget per intent, e.g. PROMPT_TOKEN_BUDGETS="fee:600,course:1200"
+prompt_assembler = PromptAssembler(
+    default_budget=int(os.environ.get('PROMPT_TOKEN_BUDGET', 1000)),
+    budgets=parse_budgets(os.environ.get('PROMPT_TOKEN_BUDGETS', ''))
+)
+
+# Cache and coalescing counters on /metrics (zero until the worker has started)
+metrics_registry.gauge('answer_cache_hits_total', 'Answer cache hits',
+                       lambda: answer_cache.counters['hits'] if answer_cache else 0, 'counter')
+metrics_registry.gauge('answer_cache_misses_total', 'Answer cache misses',
+                       lambda: answer_cache.counters['misses'] if answer_cache else 0, 'counter')
+metrics_registry.gauge('answer_cache_entries', 'Answers held in memory',
+                       lambda: answer_cache.stats()['size'] if answer_cache else 0)
+metrics_registry.gauge('semantic_cache_hits_total', 'Answers served for a reworded question',
+                       lambda: semantic_cache.counters['hits'] if semantic_cache else 0, 'counter')
+metrics_registry.gauge('server_cold_start_seconds', 'Seconds from import to a warmed-up worker',
+                       lambda: startup_state['cold_start_seconds'] or 0)
+metrics_registry.gauge('gemini_queue_depth', 'Gemini calls waiting for rate-limit capacity',
+                       lambda: gemini_scheduler.queue_depth if gemini_scheduler else 0)
+metrics_registry.gauge('gemini_retries_total', 'Gemini calls retried after a transient failure',
+                       lambda: gemini_scheduler.counters['retries'] if gemini_scheduler else 0, 'counter')
+metrics_registry.gauge('gemini_rate_limited_total', 'Gemini responses with status 429',
+                       lambda: gemini_scheduler.counters['rate_limited'] if gemini_scheduler else 0, 'counter')
+metrics_registry.gauge('chat_load_shedding_active', '1 while chat answers from retrieval alone',
+                       lambda: int(load_shedder.active))
+metrics_registry.gauge('chat_retrieval_only_total', 'Chat answers built from retrieved passages alone under load',
+                       lambda: load_shedder.counters['retrieval_only'], 'counter')
+metrics_registry.gauge('chat_coalesced_total', 'Chat requests served by another in-flight request',
+                       lambda: chat_flights.counters['collapsed'], 'counter')
+
+# Canned answers, loaded and pre-encoded once at startup
+answers = AnswerRegistry(os.environ.get('STATIC_ANSWERS_PATH', DEFAULT_ANSWERS_PATH))
+
+# Passage retrieval limits
+PASSAGE_CANDIDATES = int(os.environ.get('PASSAGE_CANDIDATES', 30))
+PASSAGE_TOP_K = int(os.environ.get('PASSAGE_TOP_K', 8))
+PASSAGE_CHAR_BUDGET = int(os.environ.get('PASSAGE_CHAR_BUDGET', 4000))
+
+def init_services(store: Optional[UniversityDataStore] = None, gemini: Optional[GeminiClient] = None):
+    """Create this worker's Mongo pool, Gemini client and caches (store/gemini replace the defaults)"""
+    global data_store, retriever, gemini_scheduler, answer_cache, semantic_cache
+
+    # One bounded MongoDB connection pool for all retrieval
+    data_store = store or UniversityDataStore.from_env()
+    if RETRIEVAL_ENGINE == 'bm25':
+        retriever = BM25Retriever(data_store, reload_interval=int(os.environ.get('BM25_RELOAD_INTERVAL', 60)))
+    else:
+        retriever = data_store
+
+    logger.info("Configuring Gemini API...")
+    # Outbound calls queue for the GEMINI_RPM/GEMINI_TPM budgets and retry within GEMINI_DEADLINE
+    gemini_scheduler = GeminiScheduler.from_env(gemini or GeminiClient.from_env(api_key))
+
+    # Cache of Gemini answers, dropped whenever the scraper records a new crawl
+    answer_cache = AnswerCache(
+        max_entries=int(os.environ.get('ANSWER_CACHE_SIZE', 1024)),
+        ttl=int(os.environ.get('ANSWER_CACHE_TTL', 3600)),
+        collection=data_store.answer_cache if os.environ.get('ANSWER_CACHE_PERSISTENT') == '1' else None,
+        version_provider=data_store.get_crawl_version
+    )
+
+    # Answers to reworded questions, matched by n-gram cosine similarity within the same route
+    semantic_cache = SemanticCache(
+        max_entries=int(os.environ.get('SEMANTIC_CACHE_SIZE', 1024)),
+        ttl=int(os.environ.get('ANSWER_CACHE_TTL', 3600)),
+        threshold=float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.85))
+    )
+
+async def warm_up():
+    """Check MongoDB, create the cache indexes and build the BM25 indexes, retrying until it works"""
+    checks = startup_state['checks']
+    if not api_key:
+        logger.error("GOOGLE_API_KEY not found in environment variables")
+    delay = 1
+    while True:
+        try:
+            await data_store.ping()
+            checks['mongo'] = 'ok'
+            logger.info("Successfully connected to MongoDB")
+            await answer_cache.ensure_indexes()
+            checks['cache_indexes'] = 'ok'
+            if isinstance(retriever, BM25Retriever):
+                await retriever.load()
+                retriever.start_watching()
+                checks['bm25_index'] = 'ok'
+            else:
+                checks['bm25_index'] = 'disabled'
+            break
+        except WARM_UP_TRANSIENT_ERRORS as e:
+            startup_state['last_error'] = str(e)
+            logger.error(f"Warm-up failed, retrying in {delay}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+        except Exception as e:
+            # Configuration or server-side errors: retrying would only hide them behind a 503
+            startup_state['last_error'] = str(e)
+            failed = next((name for name, status in checks.items() if status == 'pending'), None)
+            if failed:
+                checks[failed] = f"error: {str(e)}"
+            logger.critical(f"Warm-up failed and will not be retried: {str(e)}")
+            return
+
+    startup_state['ready'] = True
+    startup_state['last_error'] = None
+    cold_start = startup_state['cold_start_seconds'] = time.perf_counter() - BOOT_STARTED
+    if cold_start > COLD_START_TARGET:
+        logger.warning(f"Ready in {cold_start:.2f}s, above the {COLD_START_TARGET:.1f}s cold start target")
+    else:
+        logger.info(f"Ready in {cold_start:.2f}s")
 
 @app.get("/")
 async def home():
@@ -137,416 +355,392 @@ async def home():
         "endpoints": {
             "/docs": "Interactive API documentation",
             "/api/chat": "POST - Send messages to chat with the AI",
+            "/api/chat/stream": "POST - Same as /api/chat, streamed as Server-Sent Events",
+            "/api/chat/batch": "POST - Answer a list of chat requests at once, results in order",
+            "/api/cache/stats": "GET - Answer cache hit/miss counters",
+            "/api/gemini/stats": "GET - Gemini scheduler queue depth, retries and 429 counts",
+            "/api/coalescing/stats": "GET - Counts of identical in-flight chat requests collapsed into one",
+            "/metrics": "GET - Prometheus metrics: per-stage latency histograms and counters",
+            "/healthz": "GET - Liveness: the worker is up and serving",
+            "/readyz": "GET - Readiness: MongoDB, indexes and Gemini key checks; 503 until warmed up",
         }
     }
 
-async def search_university_data(query: str) -> str:
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "uptime_seconds": time.perf_counter() - BOOT_STARTED}
+
+@app.get("/readyz")
+async def readyz():
+    checks = dict(startup_state['checks'])
+    if startup_state['ready']:
+        try:
+            await asyncio.wait_for(data_store.ping(), READINESS_PING_TIMEOUT)
+        except Exception as e:
+            checks['mongo'] = f"error: {str(e) or 'ping timed out'}"
+    ready = all(status in ('ok', 'disabled') for status in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not ready",
+            "checks": checks,
+            "cold_start_seconds": startup_state['cold_start_seconds'],
+            "last_error": startup_state['last_error']
+        }
+    )
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {**answer_cache.stats(), 'semantic': semantic_cache.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/gemini/stats")
+async def gemini_stats():
+    return {**gemini_scheduler.stats(), 'load_shedding': load_shedder.stats()}
+
+@app.get("/api/coalescing/stats")
+async def coalescing_stats():
+    return {**chat_flights.stats(), 'retrieval': retrieval_flights.stats()}
+
+# Extra search terms added for each intent the router finds in a query
+SEARCH_TERM_EXPANSIONS = {
+    'course': ['course', 'program', 'degree', 'specialization', 'branch'],
+    'fee': ['fee', 'fees', 'cost', 'payment', 'charges', 'amount'],
+    'admission': ['admission', 'entry', 'application', 'apply', 'entrance'],
+    'faculty': ['faculty', 'professor', 'teacher', 'staff', 'hod', 'head'],
+    'department': ['department', 'school', 'centre', 'center'],
+    'school': ['department', 'school', 'centre', 'center'],
+    'hostel': ['hostel', 'accommodation', 'dormitory', 'residence'],
+    'scholarship': ['scholarship', 'financial aid', 'assistance', 'support'],
+    'placement': ['placement', 'job', 'career', 'recruitment', 'company'],
+    'research': ['research', 'project', 'publication', 'journal', 'paper']
+}
+
+# Extra search terms added for each department the router finds in a query
+DEPARTMENT_SEARCH_TERMS = {
+    'cse': 'computer science engineering computing programming software',
+    'ece': 'electronics communication engineering',
+    'mechanical': 'mechanical engineering manufacturing production',
+    'civil': 'civil engineering construction structural',
+    'sanskrit': 'sanskrit vedanta vyakarana sahitya',
+    'management': 'management business administration commerce mba',
+    'science': 'physics chemistry mathematics biology'
+}
+
+# Narrower department terms used when looking for fee pages
+FEE_DEPARTMENT_TERMS = {
+    'cse': 'computer science engineering',
+    'ece': 'electronics communication engineering',
+    'mechanical': 'mechanical engineering',
+    'civil': 'civil engineering',
+    'sanskrit': 'sanskrit vedanta',
+    'management': 'management business administration mba',
+    'science': 'physics chemistry mathematics biology'
+}
+
+async def retrieve_context(query: str) -> Tuple[List[dict], Optional[str]]:
+    """Find context for a query: ranked passages, or a ready text when there are none"""
     try:
-        logger.info(f"Searching MongoDB with query: {query}")
+        logger.info(f"Searching MongoDB with query: {cap_payload(query)}")
         
         # Clean and normalize the query
         query = query.lower().strip()
+        with stage('intent'):
+            route = classify(query)
         
         # If query is about departments
-        if 'department' in query or 'departments' in query:
-            return """╔══════════════════════════════════════╗
-║     AVAILABLE DEPARTMENTS          ║
-╚══════════════════════════════════════╝
-
-🎓 ENGINEERING
--------------
-• Computer Science Engineering (CSE)
-• Electronics & Communication Engineering (ECE)
-• Mechanical Engineering
-• Civil Engineering
-
-📚 MANAGEMENT
-------------
-• Master of Business Administration (MBA)
-• Bachelor of Business Administration (BBA)
-
-🔬 SCIENCE
----------
-• Physics
-• Chemistry
-• Mathematics
-• Biology
-
-📖 SANSKRIT & INDIAN CULTURE
---------------------------
-• Sanskrit
-• Vedanta
-• Vyakarana
-• Sahitya
-
-💡 Note: Each department offers various undergraduate and postgraduate programs. For specific program details, please contact the respective department or visit our website."""
+        if 'department' in route.intents:
+            return [], answers.text('departments')
 
         # If query is about fees
-        if 'fee' in query or 'fees' in query or 'cost' in query:
+        if 'fee' in route.intents:
             # Prepare search terms for fee-related content
             search_terms = "fee structure fees cost payment charges amount"
             
-            # Add department-specific terms if mentioned
-            departments = {
-                'cse': 'computer science engineering',
-                'ece': 'electronics communication engineering',
-                'mechanical': 'mechanical engineering',
-                'civil': 'civil engineering',
-                'sanskrit': 'sanskrit vedanta',
-                'management': 'management business administration mba',
-                'science': 'physics chemistry mathematics biology'
-            }
-            
             # Add department terms to search if specified
-            for dept, terms in departments.items():
-                if dept in query:
+            for dept, terms in FEE_DEPARTMENT_TERMS.items():
+                if dept in route.departments:
                     search_terms += f" {terms}"
             
             # Search MongoDB for fee information
-            pipeline = [
-                {
-                    "$match": {
-                        "$text": {"$search": search_terms}
-                    }
-                },
-                {
-                    "$addFields": {
-                        "score": {"$meta": "textScore"}
-                    }
-                },
-                {
-                    "$sort": {"score": -1}
-                },
-                {
-                    "$limit": 5
-                }
-            ]
-            
-            results = pages_collection.aggregate(pipeline)
-            results_list = list(results)
+            with stage('search_db'):
+                results_list = await retriever.text_search(search_terms, limit=5)
             
             if not results_list:
                 # If no results found, provide default fee structure
-                if 'cse' in query or 'computer' in query:
-                    if 'be' in query or 'b.e' in query or 'bachelor' in query:
-                        return """╔══════════════════════════════════════╗
-║ BE CSE FEE STRUCTURE ║
-╚══════════════════════════════════════╝
-
-B.E. Computer Science and Engineering (Full Time)
-• Tuition Fee: ₹1,50,000 per year
-• Other Fees: ₹25,000 per year
-• Total: ₹1,75,000 per year
-
-💡 Additional Information:
-• Hostel Fee: ₹60,000 per year (optional)
-• Mess Fee: ₹45,000 per year (optional)
-• Transportation Fee: ₹15,000 per year (optional)
-
-📝 Payment Details:
-• Fees can be paid in two installments
-• First installment: 60% at the time of admission
-• Second installment: 40% before the start of second semester
-
-Note: Fees are subject to change. Please contact the admission office for the most current fee structure.
-• Email: admission@kanchiuniv.ac.in
-• Phone: (044) 27264285"""
-                    elif 'me' in query or 'm.e' in query or 'master' in query:
-                        return """╔══════════════════════════════════════╗
-║ ME CSE FEE STRUCTURE ║
-╚══════════════════════════════════════╝
-
-M.E. Computer Science and Engineering
-• Tuition Fee: ₹1,00,000 per year
-• Other Fees: ₹20,000 per year
-• Total: ₹1,20,000 per year
-
-💡 Additional Information:
-• Hostel Fee: ₹60,000 per year (optional)
-• Mess Fee: ₹45,000 per year (optional)
-• Transportation Fee: ₹15,000 per year (optional)
-
-📝 Payment Details:
-• Fees can be paid in two installments
-• First installment: 60% at the time of admission
-• Second installment: 40% before the start of second semester
-
-Note: Fees are subject to change. Please contact the admission office for the most current fee structure.
-• Email: admission@kanchiuniv.ac.in
-• Phone: (044) 27264285"""
+                if 'cse' in route.departments:
+                    if 'bachelor' in route.levels:
+                        return [], answers.text('fee_be_cse')
+                    elif 'master' in route.levels:
+                        return [], answers.text('fee_me_cse')
                     else:
-                        return """╔══════════════════════════════════════╗
-║ CSE DEPARTMENT FEES ║
-╚══════════════════════════════════════╝
-
-B.E. Computer Science and Engineering
-• Tuition Fee: ₹1,50,000 per year
-• Other Fees: ₹25,000 per year
-• Total: ₹1,75,000 per year
-
-M.E. Computer Science and Engineering
-• Tuition Fee: ₹1,00,000 per year
-• Other Fees: ₹20,000 per year
-• Total: ₹1,20,000 per year
-
-💡 Additional Information:
-• Hostel Fee: ₹60,000 per year (optional)
-• Mess Fee: ₹45,000 per year (optional)
-• Transportation Fee: ₹15,000 per year (optional)
-
-📝 Payment Details:
-• Fees can be paid in two installments
-• First installment: 60% at the time of admission
-• Second installment: 40% before the start of second semester
-
-Note: Fees are subject to change. Please contact the admission office for the most current fee structure.
-• Email: admission@kanchiuniv.ac.in
-• Phone: (044) 27264285"""
+                        return [], answers.text('fee_cse')
                 else:
-                    return """╔══════════════════════════════════════╗
-║     FEE STRUCTURE OVERVIEW         ║
-╚══════════════════════════════════════╝
-
-🎓 ENGINEERING PROGRAMS
-----------------------
-B.E. Programs (All Branches)
-• Tuition Fee: ₹1,50,000 per year
-• Other Fees: ₹25,000 per year
-• Total: ₹1,75,000 per year
-
-M.E. Programs (All Branches)
-• Tuition Fee: ₹1,00,000 per year
-• Other Fees: ₹20,000 per year
-• Total: ₹1,20,000 per year
-
-📚 MANAGEMENT PROGRAMS
----------------------
-MBA (2 Years)
-• Tuition Fee: ₹1,25,000 per year
-• Other Fees: ₹20,000 per year
-• Total: ₹1,45,000 per year
-
-BBA (3 Years)
-• Tuition Fee: ₹75,000 per year
-• Other Fees: ₹15,000 per year
-• Total: ₹90,000 per year
-
-💡 Additional Information:
-• Hostel Fee: ₹60,000 per year (optional)
-• Mess Fee: ₹45,000 per year (optional)
-• Transportation Fee: ₹15,000 per year (optional)
-
-📝 Payment Details:
-• Fees can be paid in two installments
-• First installment: 60% at the time of admission
-• Second installment: 40% before the start of second semester
-
-Note: Fees are subject to change. Please contact the admission office for the most current fee structure.
-• Email: admission@kanchiuniv.ac.in
-• Phone: (044) 27264285"""
+                    return [], answers.text('fee_overview')
 
         # If query is about courses
-        if 'course' in query or 'courses' in query or 'program' in query or 'programs' in query:
-            if 'cse' in query or 'computer' in query:
-                return """╔══════════════════════════════════════╗
-║     CSE DEPARTMENT PROGRAMS        ║
-╚══════════════════════════════════════╝
-
-🎓 UNDERGRADUATE PROGRAMS
-------------------------
-B.E. Computer Science and Engineering
-• Duration: 4 years
-• Intake: 120 students
-• Specializations:
-  - Artificial Intelligence
-  - Machine Learning
-  - Data Science
-  - Cloud Computing
-  - Cybersecurity
-
-🎓 POSTGRADUATE PROGRAMS
------------------------
-M.E. Computer Science and Engineering
-• Duration: 2 years
-• Intake: 30 students
-• Specializations:
-  - Computer Networks
-  - Software Engineering
-  - Information Security
-  - Data Analytics
-
-💡 Additional Information:
-• Industry-oriented curriculum
-• Regular workshops and seminars
-• Placement assistance
-• Research opportunities
-
-📝 Admission Requirements:
-• B.E.: 10+2 with PCM
-• M.E.: B.E./B.Tech in CSE or related field
-
-Note: For detailed information about each program, please visit our website or contact the department."""
+        if 'course' in route.intents:
+            if 'cse' in route.departments:
+                return [], answers.text('programs_cse')
 
         # If query is about HOD
-        if 'hod' in query or 'head' in query:
-            if 'cse' in query or 'computer' in query:
-                return """╔══════════════════════════════════════╗
-║ CSE DEPARTMENT HOD ║
-╚══════════════════════════════════════╝
-
-Dr. M. Senthil Kumaran
-• Designation: Head of Department
-• Department: Computer Science and Engineering
-• Email: hodcse@kanchiuniv.ac.in
-• Contact: (044) 27264285"""
-            elif 'sanskrit' in query:
-                return """╔══════════════════════════════════════╗
-║ SANSKRIT DEPARTMENT HOD ║
-╚══════════════════════════════════════╝
-
-Dr. Debajyoti Jena
-• Designation: Assistant Professor & HOD
-• Department: Sanskrit and Indian Culture
-• Email: sanskrit@kanchiuniv.ac.in
-• Contact: (044) 27264285"""
+        if 'hod' in route.intents:
+            if 'cse' in route.departments:
+                return [], answers.text('hod_cse')
+            elif 'sanskrit' in route.departments:
+                return [], answers.text('hod_sanskrit')
             else:
-                return "Please specify which department's HOD information you're looking for. For example:\n• CSE HOD\n• Sanskrit HOD\n• Engineering HOD\n• Management HOD"
+                return [], answers.text('hod_unspecified')
         
         # For other types of queries, use the existing search logic
         search_terms = query
-        specific_terms = {
-            'course': ['course', 'program', 'degree', 'specialization', 'branch'],
-            'fee': ['fee', 'fees', 'cost', 'payment', 'charges', 'amount'],
-            'admission': ['admission', 'entry', 'application', 'apply', 'entrance'],
-            'faculty': ['faculty', 'professor', 'teacher', 'staff', 'hod', 'head'],
-            'department': ['department', 'school', 'centre', 'center'],
-            'hostel': ['hostel', 'accommodation', 'dormitory', 'residence'],
-            'scholarship': ['scholarship', 'financial aid', 'assistance', 'support'],
-            'placement': ['placement', 'job', 'career', 'recruitment', 'company'],
-            'research': ['research', 'project', 'publication', 'journal', 'paper']
-        }
         
         # Add relevant terms based on query content
-        for category, terms in specific_terms.items():
-            if any(term in query for term in terms):
+        for category, terms in SEARCH_TERM_EXPANSIONS.items():
+            if category in route.intents:
                 search_terms += f" {' '.join(terms)}"
                 
         # Add department-specific terms if mentioned
-        departments = {
-            'cse': 'computer science engineering computing programming software',
-            'ece': 'electronics communication engineering',
-            'mechanical': 'mechanical engineering manufacturing production',
-            'civil': 'civil engineering construction structural',
-            'sanskrit': 'sanskrit vedanta vyakarana sahitya',
-            'management': 'management business administration commerce mba',
-            'science': 'physics chemistry mathematics biology'
-        }
-        
-        for dept, terms in departments.items():
-            if dept in query:
+        for dept, terms in DEPARTMENT_SEARCH_TERMS.items():
+            if dept in route.departments:
                 search_terms += f" {terms}"
 
-        logger.info(f"Enhanced search terms: {search_terms}")
+        logger.info(f"Enhanced search terms: {cap_payload(search_terms)}")
         
-        # Perform text search with improved scoring
-        pipeline = [
-            {
-                "$match": {
-                    "$text": {"$search": search_terms}
-                }
-            },
-            {
-                "$addFields": {
-                    "score": {
-                        "$multiply": [
-                            {"$meta": "textScore"},
-                            {
-                                "$cond": [
-                                    {"$in": [{"$toLower": "$url"}, ["courses", "admission", "faculty", "departments"]]},
-                                    2,
-                                    1
-                                ]
-                            }
-                        ]
-                    }
-                }
-            },
-            {
-                "$sort": {"score": -1}
-            },
-            {
-                "$limit": 5
-            }
-        ]
+        # Prefer the passage index built at scrape time: top-k passages under a fixed budget
+        try:
+            with stage('search_db'):
+                candidates = await retriever.search_passages(search_terms, limit=PASSAGE_CANDIDATES)
+        except Exception as e:
+            logger.warning(f"Passage search unavailable, falling back to pages: {str(e)}")
+            candidates = []
+        if candidates:
+            with stage('search_scoring'):
+                passages = select_passages(candidates, search_terms, top_k=PASSAGE_TOP_K, char_budget=PASSAGE_CHAR_BUDGET)
+            if passages:
+                logger.info(f"Selected {len(passages)} of {len(candidates)} passages")
+                return passages, None
         
-        results = pages_collection.aggregate(pipeline)
-        results_list = list(results)
+        # Perform text search with improved scoring
+        with stage('search_db'):
+            results_list = await retriever.text_search(search_terms, limit=5, boost_urls=BOOSTED_URLS)
         
         if not results_list:
-            return "I apologize, but I couldn't find specific information for your query. Please try rephrasing your question or ask about a different topic."
+            return [], "I apologize, but I couldn't find specific information for your query. Please try rephrasing your question or ask about a different topic."
         
-        # Process and format results
-        formatted_response = ""
-        for doc in results_list:
-            content = doc.get('text_content', '')
-            url = doc.get('url', '')
-            title = doc.get('title', '')
-            
-            # Extract relevant paragraphs
-            paragraphs = content.split('\n')
-            relevant_paragraphs = []
-            
-            for para in paragraphs:
-                # Skip empty paragraphs
-                if not para.strip():
-                    continue
-                    
-                # Calculate relevance score for paragraph
-                para_lower = para.lower()
-                term_matches = sum(1 for term in search_terms.split() if term in para_lower)
-                if term_matches > 0:
-                    relevance_score = term_matches / len(search_terms.split())
-                    relevant_paragraphs.append((para, relevance_score))
-            
-            # Sort by relevance and take top 3 most relevant paragraphs
-            relevant_paragraphs.sort(key=lambda x: x[1], reverse=True)
-            top_paragraphs = [p[0] for p in relevant_paragraphs[:3]]
-            
-            if top_paragraphs:
-                formatted_response += f"\n🔍 From {title}:\n"
-                formatted_response += "\n".join(top_paragraphs) + "\n"
+        # Keep the most relevant paragraphs of each page as its passage
+        scoring_start = time.perf_counter()
+        passages = []
+        for doc, relevant_paragraphs in zip(results_list, top_paragraphs(results_list, search_terms)):
+            if relevant_paragraphs:
+                passages.append({
+                    'url': doc.get('url', ''),
+                    'title': doc.get('title', ''),
+                    'text': "\n".join(p[0] for p in relevant_paragraphs),
+                    'score': relevant_paragraphs[0][1]
+                })
+        record_stage('search_scoring', time.perf_counter() - scoring_start)
         
-        if not formatted_response:
-            return "I apologize, but I couldn't find specific information for your query. Please try rephrasing your question or ask about a different topic."
+        if not passages:
+            return [], "I apologize, but I couldn't find specific information for your query. Please try rephrasing your question or ask about a different topic."
             
-        return formatted_response
+        return passages, None
         
     except Exception as e:
         logger.error(f"Error searching MongoDB: {str(e)}")
-        return f"I apologize, but I encountered an error while searching. Please try again later."
-
-async def generate_response(prompt: str, language: str = 'english') -> str:
-    try:
-        logger.info("Generating response with Gemini...")
-        logger.info(f"Prompt length: {len(prompt)}")
-        
-        response = generate_with_gemini(prompt)
-        if response:
-            logger.info(f"Generated response length: {len(response)}")
-            return response
+        return [], "I apologize, but I encountered an error while searching. Please try again later."
+
+class ChatPlan:
+    """How to answer a message: a canned answer, a ready text, or a Gemini prompt"""
+
+    __slots__ = ('answer', 'text', 'prompt', 'cache_key', 'semantic_key', 'prompt_info', 'retrieval_only')
+
+    def __init__(self, answer=None, text=None, prompt=None, cache_key=None, semantic_key=None, prompt_info=None):
+        self.answer = answer
+        self.text = text
+        self.prompt = prompt
+        self.cache_key = cache_key
+        self.semantic_key = semantic_key
+        self.prompt_info = prompt_info
+        self.retrieval_only = False
+
+def semantic_scope(route, language: str) -> str:
+    """Questions only share answers when they route to the same intents, departments and levels"""
+    return '|'.join([language, ','.join(sorted(route.intents)), ','.join(sorted(route.departments)),
+                     ','.join(sorted(route.levels))])
+
+async def plan_chat(user_message: str, language: str) -> ChatPlan:
+    """Route a normalized message and do any retrieval it needs"""
+    # Classify the message into every matching intent in one pass
+    with stage('intent'):
+        route = classify(user_message)
+    
+    # Handle HOD queries directly
+    if 'hod' in route.intents:
+        if 'cse' in route.departments:
+            return ChatPlan(answer=answers.get('hod_cse', language))
+        elif 'sanskrit' in route.departments:
+            return ChatPlan(answer=answers.get('hod_sanskrit', language))
         else:
-            logger.warning("Empty response from Gemini")
-            return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
+            return ChatPlan(answer=answers.get('hod_unspecified', language))
+    
+    # Check for greetings with variations
+    if 'greeting' in route.intents:
+        return ChatPlan(answer=answers.get('greeting', language))
+
+    # Check for contact information request with variations
+    if 'contact' in route.intents:
+        return ChatPlan(answer=answers.get('contact', language))
+    
+    # Check if the message is about departments or faculty
+    if 'department' in route.intents:
+        try:
+            search_terms = "departments schools faculties"  # Initialize search_terms
+            # Add department-specific terms if mentioned
+            for dept, terms in DEPARTMENT_SEARCH_TERMS.items():
+                if dept in route.departments:
+                    search_terms += f" {terms}"
+                    break
+
+            # Search MongoDB for department information
+            with stage('search_db'):
+                results_list = await retriever.find_pages(search_terms, limit=5)
             
-    except Exception as e:
-        logger.error(f"Error generating response: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="An error occurred while generating the response. Please try again later."
-        )
+            if not results_list:
+                return ChatPlan(answer=answers.get('departments', language))
+
+            # Process and format results
+            scoring_start = time.perf_counter()
+            formatted_response = ""
+            for doc, relevant_paragraphs in zip(results_list, top_paragraphs(results_list, search_terms)):
+                if relevant_paragraphs:
+                    formatted_response += f"\n🔍 From {doc.get('title', '')}:\n"
+                    formatted_response += "\n".join(p[0] for p in relevant_paragraphs) + "\n"
+            record_stage('search_scoring', time.perf_counter() - scoring_start)
+            
+            if not formatted_response:
+                return ChatPlan(answer=answers.get('departments', language))
+                
+            return ChatPlan(text=formatted_response)
+            
+        except Exception as e:
+            logger.error(f"Error fetching department information: {str(e)}")
+            return ChatPlan(answer=answers.get('departments', language))
+
+    # Check if the message is about faculty
+    if 'faculty' in route.intents:
+        try:
+            # Prepare search terms based on department
+            department_terms = ""
+            if 'sanskrit' in route.departments:
+                department_terms = "sanskrit department faculty"
+            elif 'cse' in route.departments:
+                department_terms = "computer science engineering cse department faculty"
+            else:
+                return ChatPlan(answer=answers.get('faculty_unspecified', language))
+
+            # Search MongoDB for faculty information
+            with stage('search_db'):
+                results_list = await retriever.find_pages(department_terms, limit=3)
+            
+            if not results_list:
+                return ChatPlan(text="I apologize, but I couldn't find faculty information for the specified department. Please try again later.")
+
+            # Process and format faculty information
+            faculty_info = "╔══════════════════════════════════════╗\n"
+            faculty_info += f"║ {department_terms.upper()} DIRECTORY ║\n"
+            faculty_info += "╚══════════════════════════════════════╝\n\n"
+
+            for doc in results_list:
+                text = doc.get('text_content', '')
+                url = doc.get('url', '')
+                
+                # Extract and format faculty details
+                paragraphs = text.split('\n')
+                for para in paragraphs:
+                    if any(term in para.lower() for term in ['professor', 'hod', 'head', 'faculty', 'department']):
+                        faculty_info += para + '\n'
+
+            return ChatPlan(text=faculty_info)
+            
+        except Exception as e:
+            logger.error(f"Error fetching faculty information: {str(e)}")
+            return ChatPlan(text="I apologize, but I encountered an error while fetching faculty information. Please try again later.")
+    
+    # Expand search terms based on variations
+    search_terms = user_message
+    if 'course' in route.intents:
+        search_terms += " courses programs degrees offered B.Tech M.Tech MBA MCA BBA BCA Ph.D undergraduate postgraduate"
+    if 'requirement' in route.intents or 'admission' in route.intents:
+        search_terms += " requirements eligibility criteria admission qualification entrance"
+    if 'fee' in route.intents:
+        if 'mba_lateral' in route.intents:
+            return ChatPlan(answer=answers.get('fee_mba_lateral', language))
+        search_terms += " fees cost payment structure semester annual charges"
+    
+    # A reworded question answered before skips retrieval and Gemini
+    semantic_key = (user_message, semantic_scope(route, language))
+    await answer_cache.refresh_version()
+    with stage('semantic_cache'):
+        similar = semantic_cache.get(*semantic_key, version=answer_cache.version)
+    if similar is not None:
+        return ChatPlan(text=similar)
+
+    # Search university data for context
+    passages, context_text = await retrieval_flights.do(search_terms, lambda: retrieve_context(search_terms))
+    
+    # Assemble the prompt under the budget for this message's intent
+    with stage('prompt'):
+        prompt = prompt_assembler.build(user_message, language, passages=passages,
+                                        context_text=context_text, intents=route.intents)
+    prompt_chars.observe(prompt.chars)
+    
+    cache_key = AnswerCache.make_key(user_message, language, prompt.context)
+    return ChatPlan(prompt=prompt.text, cache_key=cache_key, semantic_key=semantic_key, prompt_info=prompt)
+
+async def shed_to_retrieval(plan: ChatPlan) -> bool:
+    """Under load, answer a Gemini plan from the cache or its retrieved passages instead"""
+    if not load_shedder.should_shed(gemini_scheduler.pending):
+        return False
+    cached = await answer_cache.get(plan.cache_key) if plan.cache_key else None
+    if cached is not None:
+        plan.text = cached
+        return True
+    context = plan.prompt_info.context.strip() if plan.prompt_info else ''
+    plan.text = context or "I apologize, but I couldn't find specific information for your query. Please try rephrasing your question or ask about a different topic."
+    plan.retrieval_only = True
+    load_shedder.record_retrieval_only()
+    return True
+
+async def answer_chat(user_message: str, language: str,
+                      gemini_slots: Optional[asyncio.Semaphore] = None) -> Tuple[ChatPlan, Optional[str]]:
+    """Plan a message and, when it needs the LLM, generate the answer.
+
+    Batch items pass gemini_slots: their Gemini calls run within those slots at batch priority.
+    """
+    plan = await plan_chat(user_message, language)
+    if plan.answer is not None or plan.text is not None:
+        return plan, None
+    if await shed_to_retrieval(plan):
+        return plan, None
+    
+    logger.info(f"Sending prompt to Gemini...")
+    
+    if gemini_slots is not None:
+        async with gemini_slots:
+            response = await generate_with_gemini(plan.prompt, cache_key=plan.cache_key,
+                                                  semantic_key=plan.semantic_key, priority=BATCH)
+    else:
+        response = await generate_with_gemini(plan.prompt, cache_key=plan.cache_key,
+                                              semantic_key=plan.semantic_key)
+    logger.info(f"Received response from Gemini")
+    return plan, response
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     try:
         logger.info("Received chat request")
         user_message = request.message.lower().strip()
@@ -557,597 +751,27 @@ async def chat(request: ChatRequest):
         if not user_message:
             raise HTTPException(status_code=400, detail="No message provided")
         
-        # Handle HOD queries directly
-        if 'hod' in user_message or 'head' in user_message:
-            if 'cse' in user_message or 'computer' in user_message:
-                return JSONResponse(content={
-                    "response": """╔══════════════════════════════════════╗
-║ CSE DEPARTMENT HOD ║
-╚══════════════════════════════════════╝
-
-Dr. M. Senthil Kumaran
-• Designation: Head of Department
-• Department: Computer Science and Engineering
-• Email: hodcse@kanchiuniv.ac.in
-• Contact: (044) 27264285""",
-                    "status": "success"
-                })
-            elif 'sanskrit' in user_message:
-                return JSONResponse(content={
-                    "response": """╔══════════════════════════════════════╗
-║ SANSKRIT DEPARTMENT HOD ║
-╚══════════════════════════════════════╝
-
-Dr. Debajyoti Jena
-• Designation: Assistant Professor & HOD
-• Department: Sanskrit and Indian Culture
-• Email: sanskrit@kanchiuniv.ac.in
-• Contact: (044) 27264285""",
-                    "status": "success"
-                })
-            else:
-                return JSONResponse(content={
-                    "response": "Please specify which department's HOD information you're looking for. For example:\n• CSE HOD\n• Sanskrit HOD\n• Engineering HOD\n• Management HOD",
-                    "status": "success"
-                })
-        
-        # Common misspellings and variations
-        greeting_variations = {
-            'hi': ['hi', 'hai', 'hii', 'hiii', 'hey', 'hei', 'hello', 'helo', 'hllo', 'namaste', 'vanakkam', 'namaskar'],
-            'contact': ['contact', 'contct', 'cotact', 'cantact', 'kontact', 'phone', 'phon', 'fone', 'email', 'e-mail', 'mail', 'adress', 'addres', 'location'],
-            'course': ['course', 'corse', 'cours', 'coarse', 'program', 'programme', 'programm', 'degree', 'dgree'],
-            'admission': ['admission', 'admision', 'addmission', 'admisn', 'admssn', 'entry', 'entery', 'joining'],
-            'requirement': ['requirement', 'requirment', 'requirment', 'eligibility', 'eligable', 'eligible', 'qualification', 'qualify'],
-            'fee': ['fee', 'fees', 'cost', 'payment', 'amount', 'charge', 'price'],
-            'faculty': ['faculty', 'professor', 'teacher', 'lecturer', 'staff', 'department head', 'hod', 'dean']
-        }
-        
-        # Helper function to check if message contains any variation
-        def contains_variation(message, category):
-            return any(var in message for var in greeting_variations[category])
-        
-        # Check for greetings with variations
-        if any(var in user_message for var in greeting_variations['hi']):
-            greeting_responses = {
-                'tamil': 'வணக்கம்! SCSVMV பல்கலைக்கழக உதவியாளருக்கு வரவேற்கிறோம். நான் உங்களுக்கு எவ்வாறு உதவ முடியும்? நீங்கள் கேட்கலாம்:\n\n- படிப்புகள் பற்றி\n- சேர்க்கை தகவல்\n- தகுதி விவரங்கள்\n- கட்டண விவரங்கள்\n- தொடர்பு விவரங்கள்',
-                'hindi': 'नमस्ते! SCSVMV विश्वविद्यालय सहायक में आपका स्वागत है। मैं आपकी कैसे मदद कर सकता हूं? आप पूछ सकते हैं:\n\n- पाठ्यक्रमों के बारे में\n- प्रवेश जानकारी\n- पात्रता विवरण\n- शुल्क विवरण\n- संपर्क विवरण',
-                'telugu': 'నమస్కారం! SCSVMV విశ్వవిద్యాలయ సహాయకునికి స్వాగతం. నేను మీకు ఎలా సహాయం చేయగలను? మీరు అడగవచ్చు:\n\n- కోర్సుల గురించి\n- ప్రవేశ సమాచారం\n- అర్హత వివరాలు\n- ఫీజు వివరాలు\n- సంప్రదింపు వివరాలు',
-                'english': 'Hello! Welcome to the SCSVMV University Assistant. How may I help you? You can ask about:\n\n- Available courses\n- Admission information\n- Eligibility details\n- Fee details\n- Contact information'
-            }
+        # Identical concurrent questions share one retrieval + generation; batch items
+        # have their own flights so an interactive request never waits at batch priority.
+        # Keyed on the message itself: punctuation such as "b.e" changes how it is routed
+        plan, response = await chat_flights.do(
+            (user_message, language, INTERACTIVE),
+            lambda: answer_chat(user_message, language)
+        )
+        if plan.answer is not None:
+            return plan.answer.to_response(http_request.headers.get('if-none-match'))
+        if plan.retrieval_only:
             return JSONResponse(content={
-                "response": greeting_responses.get(language, greeting_responses['english']),
-                "status": "success"
-            })
-
-        # Check for contact information request with variations
-        if contains_variation(user_message, 'contact'):
-            contact_info = {
-                'english': """
-╔══════════════════════════════════════╗
-║     SCSVMV UNIVERSITY CONTACTS       ║
-╚══════════════════════════════════════╝
-
-🎓 ACADEMIC DEPARTMENTS
-----------------------
-[1] ADMINISTRATIVE SECTION
-    ☎️ Landline: <a href="tel:04427264293">(044) 27264293</a>
-    📱 Mobile:   <a href="tel:6382337146">6382337146</a>
-    📧 Email:    <a href="mailto:admin@kanchiuniv.ac.in">admin@kanchiuniv.ac.in</a>
-
-[2] FINANCE SECTION
-    ☎️ Landline: <a href="tel:04427264480">(044) 27264480</a>
-    📱 Mobile:   <a href="tel:8098001628">8098001628</a>
-    📧 Email:    <a href="mailto:finance@kanchiuniv.ac.in">finance@kanchiuniv.ac.in</a>
-
-[3] COE SECTION
-    ☎️ Landline: <a href="tel:04427264306">(044) 27264306</a>
-    📱 Mobile:   <a href="tel:8838701172">8838701172</a>
-    📧 Email:    <a href="mailto:examsection@kanchiuniv.ac.in">examsection@kanchiuniv.ac.in</a>
-
-🛠️ SUPPORT SERVICES
-------------------
-[4] PURCHASE SECTION
-    ☎️ Landline: <a href="tel:04427264308">(044) 27264308</a>
-    📧 Email:    <a href="mailto:purchase@kanchiuniv.ac.in">purchase@kanchiuniv.ac.in</a>
-
-🏠 STUDENT FACILITIES
--------------------
-[5] MEN'S HOSTEL
-    📱 Mobile:   <a href="tel:8838738227">8838738227</a>
-    📧 Email:    <a href="mailto:hostels@kanchiuniv.ac.in">hostels@kanchiuniv.ac.in</a>
-
-[6] WOMEN'S HOSTEL
-    📱 Mobile:   <a href="tel:9344051473">9344051473</a>
-
-[7] TRANSPORT SECTION
-    📱 Mobile:   <a href="tel:8098001629">8098001629</a>
-    📧 Email:    <a href="mailto:transport@kanchiuniv.ac.in">transport@kanchiuniv.ac.in</a>
-
-⚕️ MEDICAL FACILITIES
--------------------
-[8] AYURVEDA HOSPITAL
-    ☎️ Landline: <a href="tel:04469189811">(044) 69189811</a>
-    📱 Mobile:   <a href="tel:8098991630">8098991630</a>
-    📧 Email:    <a href="mailto:sjsach@gmail.com">sjsach@gmail.com</a>
-
-[9] AYURVEDA COLLEGE
-    ☎️ Landline: <a href="tel:04469189800">(044) 69189800</a>
-    📱 Mobile:   <a href="tel:8098001626">8098001626</a>
-    📧 Email:    <a href="mailto:info@sjsach.org.in">info@sjsach.org.in</a>
-
-🌐 Website: <a href="https://kanchiuniv.ac.in" target="_blank">https://kanchiuniv.ac.in</a>""",
-
-                'tamil': """
-╔═════════════════════════════════════╗
-║    SCSVMV பல்கலைக்கழக தொடர்புகள்    ║
-╚═════════════════════════════════════╝
-
-🎓 கல்வித் துறைகள்
------------------
-[1] நிர்வாகப் பிரிவு
-    ☎️ தொலைபேசி: <a href="tel:04427264293">(044) 27264293</a>
-    📱 கைபேசி:   <a href="tel:6382337146">6382337146</a>
-    📧 மின்னஞ்சல்: <a href="mailto:admin@kanchiuniv.ac.in">admin@kanchiuniv.ac.in</a>
-
-[2] நிதிப் பிரிவு
-    ☎️ தொலைபேசி: <a href="tel:04427264480">(044) 27264480</a>
-    📱 கைபேசி:   <a href="tel:8098001628">8098001628</a>
-    📧 மின்னஞ்சல்: <a href="mailto:finance@kanchiuniv.ac.in">finance@kanchiuniv.ac.in</a>
-
-[3] தேர்வுப் பிரிவு
-    ☎️ தொலைபேசி: <a href="tel:04427264306">(044) 27264306</a>
-    📱 கைபேசி:   <a href="tel:8838701172">8838701172</a>
-    📧 மின்னஞ்சல்: <a href="mailto:examsection@kanchiuniv.ac.in">examsection@kanchiuniv.ac.in</a>
-
-🛠️ உதவி சேவைகள்
----------------
-[4] கொள்முதல் பிரிவு
-    ☎️ தொலைபேசி: <a href="tel:04427264308">(044) 27264308</a>
-    📧 மின்னஞ்சல்: <a href="mailto:purchase@kanchiuniv.ac.in">purchase@kanchiuniv.ac.in</a>
-
-🏠 மாணவர் வசதிகள்
-----------------
-[5] ஆண்கள் விடுதி
-    📱 கைபேசி:   <a href="tel:8838738227">8838738227</a>
-    📧 மின்னஞ்சல்: <a href="mailto:hostels@kanchiuniv.ac.in">hostels@kanchiuniv.ac.in</a>
-
-[6] பெண்கள் விடுதி
-    📱 கைபேசி:   <a href="tel:9344051473">9344051473</a>
-
-[7] போக்குவரத்து பிரிவு
-    📱 கைபேசி:   <a href="tel:8098001629">8098001629</a>
-    📧 மின்னஞ்சல்: <a href="mailto:transport@kanchiuniv.ac.in">transport@kanchiuniv.ac.in</a>
-
-⚕️ மருத்துவ வசதிகள்
------------------
-[8] ஆயுர்வேத மருத்துவமனை
-    ☎️ தொலைபேசி: <a href="tel:04469189811">(044) 69189811</a>
-    📱 கைபேசி:   <a href="tel:8098991630">8098991630</a>
-    📧 மின்னஞ்சல்: <a href="mailto:sjsach@gmail.com">sjsach@gmail.com</a>
-
-[9] ஆயுர்வேத கல்லூரி
-    ☎️ தொலைபேசி: <a href="tel:04469189800">(044) 69189800</a>
-    📱 கைபேசி:   <a href="tel:8098001626">8098001626</a>
-    📧 மின்னஞ்சல்: <a href="mailto:info@sjsach.org.in">info@sjsach.org.in</a>
-
-🌐 வலைத்தளம்: <a href="https://kanchiuniv.ac.in" target="_blank">https://kanchiuniv.ac.in</a>""",
-
-                'hindi': """
-╔═════════════════════════════════════╗
-║    SCSVMV विश्वविद्यालय संपर्क सूची    ║
-╚═════════════════════════════════════╝
-
-🎓 शैक्षणिक विभाग
----------------
-[1] प्रशासनिक विभाग
-    ☎️ लैंडलाइन: <a href="tel:04427264293">(044) 27264293</a>
-    📱 मोबाइल:  <a href="tel:6382337146">6382337146</a>
-    📧 ईमेल:    <a href="mailto:admin@kanchiuniv.ac.in">admin@kanchiuniv.ac.in</a>
-
-[2] वित्त विभाग
-    ☎️ लैंडलाइन: <a href="tel:04427264480">(044) 27264480</a>
-    📱 मोबाइल:  <a href="tel:8098001628">8098001628</a>
-    📧 ईमेल:    <a href="mailto:finance@kanchiuniv.ac.in">finance@kanchiuniv.ac.in</a>
-
-[3] परीक्षा विभाग
-    ☎️ लैंडलाइन: <a href="tel:04427264306">(044) 27264306</a>
-    📱 मोबाइल:  <a href="tel:8838701172">8838701172</a>
-    📧 ईमेल:    <a href="mailto:examsection@kanchiuniv.ac.in">examsection@kanchiuniv.ac.in</a>
-
-🛠️ सहायक सेवाएं
--------------
-[4] क्रय विभाग
-    ☎️ लैंडलाइन: <a href="tel:04427264308">(044) 27264308</a>
-    📧 ईमेल:    <a href="mailto:purchase@kanchiuniv.ac.in">purchase@kanchiuniv.ac.in</a>
-
-🏠 छात्र सुविधाएं
---------------
-[5] पुरुष छात्रावास
-    📱 मोबाइल:  <a href="tel:8838738227">8838738227</a>
-    📧 ईमेल:    <a href="mailto:hostels@kanchiuniv.ac.in">hostels@kanchiuniv.ac.in</a>
-
-[6] महिला छात्रावास
-    📱 मोबाइल:  <a href="tel:9344051473">9344051473</a>
-
-[7] परिवहन विभाग
-    📱 मोबाइल:  <a href="tel:8098001629">8098001629</a>
-    📧 ईमेल:    <a href="mailto:transport@kanchiuniv.ac.in">transport@kanchiuniv.ac.in</a>
-
-⚕️ चिकित्सा सुविधाएं
------------------
-[8] आयुर्वेद अस्पताल
-    ☎️ लैंडलाइन: <a href="tel:04469189811">(044) 69189811</a>
-    📱 मोबाइल:  <a href="tel:8098991630">8098991630</a>
-    📧 ईमेल:    <a href="mailto:sjsach@gmail.com">sjsach@gmail.com</a>
-
-[9] आयुर्वेद कॉलेज
-    ☎️ लैंडलाइन: <a href="tel:04469189800">(044) 69189800</a>
-    📱 मोबाइल:  <a href="tel:8098001626">8098001626</a>
-    📧 ईमेल:    <a href="mailto:info@sjsach.org.in">info@sjsach.org.in</a>
-
-🌐 वेबसाइट: <a href="https://kanchiuniv.ac.in" target="_blank">https://kanchiuniv.ac.in</a>""",
-
-                'telugu': """
-╔═════════════════════════════════════╗
-║    SCSVMV విశ్వవిద్యాలయ సంప్రదింపులు    ║
-╚═════════════════════════════════════╝
-
-🎓 విద్యా విభాగాలు
-----------------
-[1] పరిపాలన విభాగం
-    ☎️ ల్యాండ్‌లైన్: <a href="tel:04427264293">(044) 27264293</a>
-    📱 మొబైల్:    <a href="tel:6382337146">6382337146</a>
-    📧 ఇమెయిల్:   <a href="mailto:admin@kanchiuniv.ac.in">admin@kanchiuniv.ac.in</a>
-
-[2] ఆర్థిక విభాగం
-    ☎️ ల్యాండ్‌లైన్: <a href="tel:04427264480">(044) 27264480</a>
-    📱 మొబైల్:    <a href="tel:8098001628">8098001628</a>
-    📧 ఇమెయిల్:   <a href="mailto:finance@kanchiuniv.ac.in">finance@kanchiuniv.ac.in</a>
-
-[3] పరీక్షల విభాగం
-    ☎️ ల్యాండ్‌లైన్: <a href="tel:04427264306">(044) 27264306</a>
-    📱 మొబైల్:    <a href="tel:8838701172">8838701172</a>
-    📧 ఇమెయిల్:   <a href="mailto:examsection@kanchiuniv.ac.in">examsection@kanchiuniv.ac.in</a>
-
-🛠️ సహాయక సేవలు
---------------
-[4] కొనుగోలు విభాగం
-    ☎️ ల్యాండ్‌లైన్: <a href="tel:04427264308">(044) 27264308</a>
-    📧 ఇమెయిల్:   <a href="mailto:purchase@kanchiuniv.ac.in">purchase@kanchiuniv.ac.in</a>
-
-🏠 విద్యార్థి సౌకర్యాలు
---------------------
-[5] పురుషుల వసతిగృహం
-    📱 మొబైల్:    <a href="tel:8838738227">8838738227</a>
-    📧 ఇమెయిల్:   <a href="mailto:hostels@kanchiuniv.ac.in">hostels@kanchiuniv.ac.in</a>
-
-[6] మహిళల వసతిగృహం
-    📱 మొబైల్:    <a href="tel:9344051473">9344051473</a>
-
-[7] రవాణా విభాగం
-    📱 మొబైల్:    <a href="tel:8098001629">8098001629</a>
-    📧 ఇమెయిల్:   <a href="mailto:transport@kanchiuniv.ac.in">transport@kanchiuniv.ac.in</a>
-
-⚕️ వైద్య సౌకర్యాలు
-----------------
-[8] ఆయుర్వేద ఆసుపత్రి
-    ☎️ ల్యాండ్‌లైన్: <a href="tel:04469189811">(044) 69189811</a>
-    📱 మొబైల్:    <a href="tel:8098991630">8098991630</a>
-    📧 ఇమెయిల్:   <a href="mailto:sjsach@gmail.com">sjsach@gmail.com</a>
-
-[9] ఆయుర్వేద కళాశాల
-    ☎️ ల్యాండ్‌లైన్: <a href="tel:04469189800">(044) 69189800</a>
-    📱 మొబైల్:    <a href="tel:8098001626">8098001626</a>
-    📧 ఇమెయిల్:   <a href="mailto:info@sjsach.org.in">info@sjsach.org.in</a>
-
-🌐 వెబ్‌సైట్: <a href="https://kanchiuniv.ac.in" target="_blank">https://kanchiuniv.ac.in</a>"""
-            }
+                "response": plan.text,
+                "status": "success",
+                "retrieval_only": True
+            }, headers={"X-Answer-Mode": "retrieval-only"})
+        if plan.text is not None:
             return JSONResponse(content={
-                "response": contact_info.get(language, contact_info['english']),
+                "response": plan.text,
                 "status": "success"
             })
         
-        # Check if the message is about departments or faculty
-        if 'department' in user_message.lower() or 'departments' in user_message.lower():
-            try:
-                search_terms = "departments schools faculties"  # Initialize search_terms
-                # Add department-specific terms if mentioned
-                if 'cse' in user_message or 'computer' in user_message:
-                    search_terms += " computer science engineering computing programming software"
-                elif 'ece' in user_message or 'electronics' in user_message:
-                    search_terms += " electronics communication engineering"
-                elif 'mechanical' in user_message:
-                    search_terms += " mechanical engineering manufacturing production"
-                elif 'civil' in user_message:
-                    search_terms += " civil engineering construction structural"
-                elif 'sanskrit' in user_message:
-                    search_terms += " sanskrit vedanta vyakarana sahitya"
-                elif 'management' in user_message or 'mba' in user_message:
-                    search_terms += " management business administration commerce mba"
-                elif 'science' in user_message:
-                    search_terms += " physics chemistry mathematics biology"
-
-                # Search MongoDB for department information
-                results = pages_collection.find(
-                    {"$text": {"$search": search_terms}},
-                    {
-                        "score": {"$meta": "textScore"},
-                        "text_content": 1,
-                        "url": 1,
-                        "title": 1
-                    }
-                ).sort([("score", {"$meta": "textScore"})]).limit(5)
-
-                results_list = list(results)
-                
-                if not results_list:
-                    return JSONResponse(content={
-                        'response': """╔══════════════════════════════════════╗
-║     AVAILABLE DEPARTMENTS          ║
-╚══════════════════════════════════════╝
-
-🎓 ENGINEERING
--------------
-• Computer Science Engineering (CSE)
-• Electronics & Communication Engineering (ECE)
-• Mechanical Engineering
-• Civil Engineering
-
-📚 MANAGEMENT
-------------
-• Master of Business Administration (MBA)
-• Bachelor of Business Administration (BBA)
-
-🔬 SCIENCE
----------
-• Physics
-• Chemistry
-• Mathematics
-• Biology
-
-📖 SANSKRIT & INDIAN CULTURE
---------------------------
-• Sanskrit
-• Vedanta
-• Vyakarana
-• Sahitya
-
-💡 Note: Each department offers various undergraduate and postgraduate programs. For specific program details, please contact the respective department or visit our website.""",
-                        'status': 'success'
-                    })
-
-                # Process and format results
-                formatted_response = ""
-                for doc in results_list:
-                    content = doc.get('text_content', '')
-                    url = doc.get('url', '')
-                    title = doc.get('title', '')
-                    
-                    # Extract relevant paragraphs
-                    paragraphs = content.split('\n')
-                    relevant_paragraphs = []
-                    
-                    for para in paragraphs:
-                        # Skip empty paragraphs
-                        if not para.strip():
-                            continue
-                            
-                        # Calculate relevance score for paragraph
-                        para_lower = para.lower()
-                        term_matches = sum(1 for term in search_terms.split() if term in para_lower)
-                        if term_matches > 0:
-                            relevance_score = term_matches / len(search_terms.split())
-                            relevant_paragraphs.append((para, relevance_score))
-                    
-                    # Sort by relevance and take top 3 most relevant paragraphs
-                    relevant_paragraphs.sort(key=lambda x: x[1], reverse=True)
-                    top_paragraphs = [p[0] for p in relevant_paragraphs[:3]]
-                    
-                    if top_paragraphs:
-                        formatted_response += f"\n🔍 From {title}:\n"
-                        formatted_response += "\n".join(top_paragraphs) + "\n"
-                
-                if not formatted_response:
-                    return JSONResponse(content={
-                        'response': """╔══════════════════════════════════════╗
-║     AVAILABLE DEPARTMENTS          ║
-╚══════════════════════════════════════╝
-
-🎓 ENGINEERING
--------------
-• Computer Science Engineering (CSE)
-• Electronics & Communication Engineering (ECE)
-• Mechanical Engineering
-• Civil Engineering
-
-📚 MANAGEMENT
-------------
-• Master of Business Administration (MBA)
-• Bachelor of Business Administration (BBA)
-
-🔬 SCIENCE
----------
-• Physics
-• Chemistry
-• Mathematics
-• Biology
-
-📖 SANSKRIT & INDIAN CULTURE
---------------------------
-• Sanskrit
-• Vedanta
-• Vyakarana
-• Sahitya
-
-💡 Note: Each department offers various undergraduate and postgraduate programs. For specific program details, please contact the respective department or visit our website.""",
-                        'status': 'success'
-                    })
-                    
-                return JSONResponse(content={
-                    'response': formatted_response,
-                    'status': 'success'
-                })
-                
-            except Exception as e:
-                logger.error(f"Error fetching department information: {str(e)}")
-                return JSONResponse(content={
-                    'response': """╔══════════════════════════════════════╗
-║     AVAILABLE DEPARTMENTS          ║
-╚══════════════════════════════════════╝
-
-🎓 ENGINEERING
--------------
-• Computer Science Engineering (CSE)
-• Electronics & Communication Engineering (ECE)
-• Mechanical Engineering
-• Civil Engineering
-
-📚 MANAGEMENT
-------------
-• Master of Business Administration (MBA)
-• Bachelor of Business Administration (BBA)
-
-🔬 SCIENCE
----------
-• Physics
-• Chemistry
-• Mathematics
-• Biology
-
-📖 SANSKRIT & INDIAN CULTURE
---------------------------
-• Sanskrit
-• Vedanta
-• Vyakarana
-• Sahitya
-
-💡 Note: Each department offers various undergraduate and postgraduate programs. For specific program details, please contact the respective department or visit our website.""",
-                    'status': 'success'
-                })
-
-        # Check if the message is about faculty
-        if any(variation in user_message for variation in greeting_variations['faculty']):
-            try:
-                # Prepare search terms based on department
-                department_terms = ""
-                if 'sanskrit' in user_message.lower():
-                    department_terms = "sanskrit department faculty"
-                elif 'cse' in user_message.lower() or 'computer' in user_message.lower():
-                    department_terms = "computer science engineering cse department faculty"
-                else:
-                    return {
-                        'response': """Please specify which department's faculty information you're looking for. For example:
-• CSE Faculty
-• Sanskrit Faculty
-• Engineering Faculty
-• Management Faculty
-• Science Faculty
-• Arts Faculty""",
-                        'language': language
-                    }
-
-                # Search MongoDB for faculty information
-                results = pages_collection.find(
-                    {"$text": {"$search": department_terms}},
-                    {
-                        "score": {"$meta": "textScore"},
-                        "text_content": 1,
-                        "url": 1,
-                        "title": 1
-                    }
-                ).sort([("score", {"$meta": "textScore"})]).limit(3)
-
-                results_list = list(results)
-                
-                if not results_list:
-                    return {
-                        'response': f"I apologize, but I couldn't find faculty information for the specified department. Please try again later.",
-                        'language': language
-                    }
-
-                # Process and format faculty information
-                faculty_info = "╔══════════════════════════════════════╗\n"
-                faculty_info += f"║ {department_terms.upper()} DIRECTORY ║\n"
-                faculty_info += "╚══════════════════════════════════════╝\n\n"
-
-                for doc in results_list:
-                    text = doc.get('text_content', '')
-                    url = doc.get('url', '')
-                    
-                    # Extract and format faculty details
-                    paragraphs = text.split('\n')
-                    for para in paragraphs:
-                        if any(term in para.lower() for term in ['professor', 'hod', 'head', 'faculty', 'department']):
-                            faculty_info += para + '\n'
-
-                return {
-                    'response': faculty_info,
-                    'language': language
-                }
-                
-            except Exception as e:
-                logger.error(f"Error fetching faculty information: {str(e)}")
-                return {
-                    'response': "I apologize, but I encountered an error while fetching faculty information. Please try again later.",
-                    'language': language
-                }
-        
-        # Expand search terms based on variations
-        search_terms = user_message
-        if contains_variation(user_message, 'course'):
-            search_terms += " courses programs degrees offered B.Tech M.Tech MBA MCA BBA BCA Ph.D undergraduate postgraduate"
-        if contains_variation(user_message, 'requirement') or contains_variation(user_message, 'admission'):
-            search_terms += " requirements eligibility criteria admission qualification entrance"
-        if contains_variation(user_message, 'fee'):
-            if "mba lateral entry" in user_message or "mba lateral" in user_message or "lateral entry mba" in user_message:
-                return {
-                    "response": """🎓 MBA LATERAL ENTRY FEE STRUCTURE
-
-📊 FEE DETAILS
-• Tuition Fee: ₹75,000 per semester
-• Registration Fee: ₹5,000 (one-time)
-• Examination Fee: ₹2,500 per semester
-• Library Fee: ₹1,500 per semester
-• Laboratory Fee: ₹1,000 per semester
-• Development Fee: ₹2,000 per semester
-• Sports Fee: ₹500 per semester
-• Medical Fee: ₹500 per semester
-• Student Welfare Fee: ₹1,000 per semester
-
-💡 IMPORTANT NOTES
-• Total fee per semester: ₹84,000
-• Hostel and mess charges are additional
-• Fees are subject to revision as per university norms
-• Payment can be made through online/offline modes
-• Installment facility available
-
-📞 FOR MORE INFORMATION
-• Contact: (044) 27264285
-• Email: admission@kanchiuniv.ac.in
-• Visit: https://kanchiuniv.ac.in/admission/fee-structure/""",
-                    "language": language
-                }
-            search_terms += " fees cost payment structure semester annual charges"
-        
-        # Search university data for context
-        context = await search_university_data(search_terms)
-        
-        # Format prompt
-        prompt = f"""Based on the following information about SCSVMV University, please answer the question.
-Please provide the answer in {language} language.
-
-Context from the university database:
-{context}
-
-Question: {user_message}
-
-Answer:"""
-        
-        logger.info(f"Sending prompt to Gemini...")
-        
-        response = generate_with_gemini(prompt)
-        logger.info(f"Received response from Gemini")
-        
         return JSONResponse(content={
             "response": response,
             "status": "success"
@@ -1166,8 +790,111 @@ Answer:"""
             }
         )
 
+async def answer_batch_item(index: int, request: ChatRequest) -> dict:
+    user_message = request.message.lower().strip()
+    if not user_message:
+        return {"index": index, "status": "error", "error": "No message provided"}
+    try:
+        plan, response = await chat_flights.do(
+            (user_message, request.language, BATCH),
+            lambda: answer_chat(user_message, request.language, gemini_slots=batch_gemini_slots)
+        )
+        if plan.answer is not None:
+            response = plan.answer.text
+        elif plan.text is not None:
+            response = plan.text
+        if plan.retrieval_only:
+            return {"index": index, "status": "success", "response": response, "retrieval_only": True}
+        return {"index": index, "status": "success", "response": response}
+    except Exception as e:
+        logger.error(f"Error in chat batch item {index}: {str(e)}")
+        return {
+            "index": index,
+            "status": "error",
+            "error": str(e),
+            "response": "I apologize, but something went wrong. Please try again later."
+        }
+
+@app.post("/api/chat/batch")
+async def chat_batch(requests: List[ChatRequest]):
+    """Answer a list of chat requests concurrently; results come back in request order"""
+    logger.info(f"Received chat batch of {len(requests)} requests")
+    if not requests:
+        raise HTTPException(status_code=400, detail="No requests provided")
+    if len(requests) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX_ITEMS} requests per batch")
+
+    results = await asyncio.gather(*(answer_batch_item(i, r) for i, r in enumerate(requests)))
+    return {
+        "status": "success",
+        "results": list(results)
+    }
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Stream the answer as Server-Sent Events: `data: {"text": ...}` chunks, then `event: done`"""
+    logger.info("Received streaming chat request")
+    user_message = request.message.lower().strip()
+    language = request.language
+    
+    logger.info(f"Processing message: {user_message[:50]}... in {language}")
+    
+    if not user_message:
+        raise HTTPException(status_code=400, detail="No message provided")
+
+    async def events():
+        try:
+            plan = await plan_chat(user_message, language)
+            if plan.answer is not None:
+                yield sse_event({"text": plan.answer.text})
+            elif plan.text is not None or await shed_to_retrieval(plan):
+                yield sse_event({"text": plan.text})
+            else:
+                logger.info(f"Streaming prompt to Gemini...")
+                async for chunk in stream_with_gemini(plan.prompt, cache_key=plan.cache_key,
+                                                    semantic_key=plan.semantic_key):
+                    yield sse_event({"text": chunk})
+            if plan.retrieval_only:
+                yield sse_event({"status": "success", "retrieval_only": True}, event="done")
+            else:
+                yield sse_event({"status": "success"}, event="done")
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {str(e)}")
+            yield sse_event({
+                "status": "error",
+                "error": str(e),
+                "text": "I apologize, but something went wrong. Please try again later."
+            }, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def available_cores() -> int:
+    """CPU cores this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
 if __name__ == '__main__':
     import uvicorn
     port = int(os.environ.get('PORT', 5003))
-    logger.info(f"Starting server on port {port}")
-    uvicorn.run("server:app", host="0.0.0.0", port=port, reload=True, log_level="info")
\ No newline at end of file
+    if os.environ.get('SERVER_MODE') == 'production':
+        # One worker process per available core (WEB_CONCURRENCY overrides), no reloader
+        workers = int(os.environ.get('WEB_CONCURRENCY', available_cores()))
+        # Inherited by the workers, which then log to one file per process
+        os.environ['WEB_CONCURRENCY'] = str(workers)
+        logger.info(f"Starting {workers} workers on port {port}")
+        uvicorn.run("server:app", host="0.0.0.0", port=port, workers=workers, log_level="info",
+                    timeout_graceful_shutdown=SHUTDOWN_DRAIN_TIMEOUT)
+    else:
+        logger.info(f"Starting server on port {port}")
+        uvicorn.run("server:app", host="0.0.0.0", port=port, reload=True, log_level="info")
\ No newline at end of file
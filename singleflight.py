@@ -0,0 +1,36 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one shared in-flight task.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task instead of starting their own. The task
+    is shielded, so a caller that disconnects does not cancel the work for
+    the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.counters = {'executed': 0, 'collapsed': 0}
+
+    async def do(self, key, fn):
+        """Return the result of `fn()`, sharing one call among concurrent callers of `key`"""
+        task = self._calls.get(key)
+        if task is not None:
+            self.counters['collapsed'] += 1
+        else:
+            self.counters['executed'] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def wait(self, timeout=None):
+        """Wait up to `timeout` seconds for every in-flight call to finish"""
+        tasks = list(self._calls.values())
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def stats(self):
+        return {**self.counters, 'in_flight': len(self._calls)}
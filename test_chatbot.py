@@ -1,6 +1,7 @@
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 def test_chatbot():
     base_url = "http://localhost:5003/api/chat"
@@ -35,27 +36,34 @@ def test_chatbot():
     ]
     
     print("Starting chatbot tests...\n")
-    
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\nTest Case {i}:")
-        print(f"Query: {test_case['message']}")
-        print(f"Language: {test_case['language']}")
-        print("-" * 50)
-        
+
+    def run_case(test_case):
+        start = time.perf_counter()
         try:
             response = requests.post(base_url, headers=headers, json=test_case)
+            elapsed = time.perf_counter() - start
             if response.status_code == 200:
-                result = response.json()
-                print("Response:")
-                print(result['response'])
-            else:
-                print(f"Error: Status code {response.status_code}")
-                print(response.text)
+                return elapsed, "Response:\n" + response.json()['response']
+            return elapsed, f"Error: Status code {response.status_code}\n{response.text}"
         except Exception as e:
-            print(f"Error: {str(e)}")
-        
+            return time.perf_counter() - start, f"Error: {str(e)}"
+
+    # Send every case at once; use loadtest.py for throughput and latency percentiles
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(test_cases)) as executor:
+        results = list(executor.map(run_case, test_cases))
+    total = time.perf_counter() - start
+
+    for i, (test_case, (elapsed, output)) in enumerate(zip(test_cases, results), 1):
+        print(f"\nTest Case {i}:")
+        print(f"Query: {test_case['message']}")
+        print(f"Language: {test_case['language']}")
+        print(f"Time: {elapsed * 1000:.0f} ms")
+        print("-" * 50)
+        print(output)
         print("-" * 50)
-        time.sleep(1)  # Add a small delay between requests
+
+    print(f"\n{len(test_cases)} requests in {total:.2f}s")
 
 if __name__ == "__main__":
     test_chatbot() 
\ No newline at end of file
@@ -0,0 +1,19 @@
+import json
+import os
+
+import pytest
+
+from intent_router import IntentRouter
+
+with open(os.path.join(os.path.dirname(__file__), 'intent_corpus.json'), encoding='utf-8') as f:
+    CORPUS = json.load(f)
+
+router = IntentRouter()
+
+
+@pytest.mark.parametrize('case', CORPUS, ids=[case['message'] for case in CORPUS])
+def test_intent_corpus(case):
+    route = router.classify(case['message'])
+    assert route.intents == set(case['intents'])
+    assert route.departments == set(case.get('departments', []))
+    assert route.levels == set(case.get('levels', []))
@@ -0,0 +1,199 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from page_dedup import (MIN_SHINGLES, NearDuplicateIndex, canonicalize_url, hamming_distance, is_archive_url,
+                        main_text, simhash)
+
+NAV = """
+<header class="site-header"><h1>Sri Chandrasekharendra Saraswathi Viswa Mahavidyalaya</h1>
+<nav><ul><li>Home</li><li>About</li><li>Admissions</li><li>Departments</li><li>Research</li><li>Contact</li></ul></nav>
+</header>
+"""
+FOOTER = """
+<footer class="site-footer"><p>Enathur, Kanchipuram, Tamil Nadu 631561. Phone 044 2726 4301. Email info at kanchiuniv
+dot ac dot in. Deemed to be University under section 3 of the UGC Act 1956, accredited with an A grade by NAAC.
+Quick links: admissions, examinations, results, library, hostel, placements, alumni, grievance redressal, anti
+ragging committee, right to information, mandatory disclosure, careers, tenders, downloads, photo gallery, sitemap.
+Copyright 2024 all rights reserved. Designed and maintained by the university computer centre.</p></footer>
+"""
+FEES = """
+<h2>Fee structure 2024-25</h2>
+<p>Tuition fees for the undergraduate engineering programmes are payable per semester at the accounts office or
+online through the fee portal. The B.E. programmes in computer science, electronics and mechanical engineering
+charge sixty thousand rupees a semester, while civil and electrical charge fifty five thousand. Hostel and mess
+charges are billed separately each academic year. A late fee of five hundred rupees applies after the due date,
+and scholarship holders should submit their sanction letters before paying the balance amount.</p>
+"""
+FACULTY = """
+<h2>Faculty of the Department of Sanskrit and Indian Culture</h2>
+<p>Professor Ramachandran heads the department and teaches Vedanta and Nyaya. Doctor Lakshmi Narayanan works on
+manuscript studies and supervises doctoral research on the Kanchi collections. Assistant professors Venkatesan,
+Meenakshi Sundaram and Priya Raghavan teach grammar, poetics and classical literature to the undergraduate and
+postgraduate batches. Visiting faculty from the oriental research institute offer electives on epigraphy and
+temple architecture every even semester, and guest lectures are announced on the notice board.</p>
+"""
+
+
+def page(body, chrome=True):
+    html = f"<html><body>{NAV if chrome else ''}<main><article>{body}</article></main>{FOOTER if chrome else ''}</body></html>"
+    return BeautifulSoup(html, 'lxml')
+
+
+CANONICAL_URLS = [
+    ('https://kanchiuniv.ac.in/admissions/', 'https://kanchiuniv.ac.in/admissions/'),
+    ('HTTPS://KanchiUniv.AC.IN/admissions/', 'https://kanchiuniv.ac.in/admissions/'),
+    ('https://kanchiuniv.ac.in/admissions', 'https://kanchiuniv.ac.in/admissions/'),
+    ('https://kanchiuniv.ac.in', 'https://kanchiuniv.ac.in/'),
+    ('https://kanchiuniv.ac.in//admissions//ug', 'https://kanchiuniv.ac.in/admissions/ug/'),
+    ('https://kanchiuniv.ac.in/files/prospectus.pdf', 'https://kanchiuniv.ac.in/files/prospectus.pdf'),
+    ('https://kanchiuniv.ac.in/admissions/#fees', 'https://kanchiuniv.ac.in/admissions/'),
+    ('https://kanchiuniv.ac.in:443/admissions/', 'https://kanchiuniv.ac.in/admissions/'),
+    ('http://kanchiuniv.ac.in:80/admissions/', 'http://kanchiuniv.ac.in/admissions/'),
+    ('http://kanchiuniv.ac.in:8080/admissions/', 'http://kanchiuniv.ac.in:8080/admissions/'),
+    ('https://kanchiuniv.ac.in/admissions/?utm_source=fb&utm_medium=social', 'https://kanchiuniv.ac.in/admissions/'),
+    ('https://kanchiuniv.ac.in/admissions/?fbclid=abc&ref=home', 'https://kanchiuniv.ac.in/admissions/'),
+    ('https://kanchiuniv.ac.in/?page_id=12&lang=en', 'https://kanchiuniv.ac.in/?lang=en&page_id=12'),
+    ('https://kanchiuniv.ac.in/?lang=en&page_id=12', 'https://kanchiuniv.ac.in/?lang=en&page_id=12'),
+    ('  https://kanchiuniv.ac.in/admissions/  ', 'https://kanchiuniv.ac.in/admissions/'),
+    # Malformed ports are dropped, not raised
+    ('http://kanchiuniv.ac.in:abc/x', None),
+    ('http://kanchiuniv.ac.in:99999/x', None),
+    ('http://[abc/x', None),
+]
+
+ARCHIVE_URLS = [
+    ('https://kanchiuniv.ac.in/tag/admissions/', True),
+    ('https://kanchiuniv.ac.in/author/admin/', True),
+    ('https://kanchiuniv.ac.in/feed/', True),
+    ('https://kanchiuniv.ac.in/news/comments/feed/', True),
+    ('https://kanchiuniv.ac.in/wp-json/wp/v2/posts', True),
+    ('https://kanchiuniv.ac.in/news/page/2/', True),
+    ('https://kanchiuniv.ac.in/news/convocation/trackback/', True),
+    ('https://kanchiuniv.ac.in/?s=fees', True),
+    ('https://kanchiuniv.ac.in/?paged=3', True),
+    ('https://kanchiuniv.ac.in/?attachment_id=42', True),
+    ('https://kanchiuniv.ac.in/admissions/', False),
+    ('https://kanchiuniv.ac.in/tagore-hall/', False),
+    ('https://kanchiuniv.ac.in/pages/2/', False),
+    ('https://kanchiuniv.ac.in/?page_id=12', False),
+    ('http://[abc/x', False),
+]
+
+
+@pytest.mark.parametrize('url, expected', CANONICAL_URLS, ids=[url for url, _ in CANONICAL_URLS])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize('url, expected', CANONICAL_URLS, ids=[url for url, _ in CANONICAL_URLS])
+def test_canonicalize_url_is_idempotent(url, expected):
+    if expected is not None:
+        assert canonicalize_url(expected) == expected
+
+
+@pytest.mark.parametrize('url, expected', ARCHIVE_URLS, ids=[url for url, _ in ARCHIVE_URLS])
+def test_is_archive_url(url, expected):
+    assert is_archive_url(url) == expected
+
+
+def test_main_text_leaves_out_site_chrome():
+    text = main_text(page(FEES))
+    assert 'Fee structure' in text
+    assert 'Kanchipuram' not in text
+    assert 'Departments' not in text
+
+
+def test_main_text_keeps_article_header():
+    soup = BeautifulSoup(f"<html><body>{NAV}<article><header><h1>Convocation 2024</h1></header>{FEES}</article>"
+                         f"<aside class='widget-area'>Recent posts</aside>{FOOTER}</body></html>", 'lxml')
+    text = main_text(soup)
+    assert text.startswith('Convocation 2024')
+    assert 'Recent posts' not in text
+    assert 'Kanchipuram' not in text
+
+
+def test_main_text_without_main_element():
+    soup = BeautifulSoup(f"<html><body>{NAV}<div class='content'>{FACULTY}</div>"
+                         f"<div id='sidebar'>Archives</div>{FOOTER}</body></html>", 'lxml')
+    text = main_text(soup)
+    assert 'Ramachandran' in text
+    assert 'Archives' not in text
+    assert 'Kanchipuram' not in text
+
+
+def test_simhash_is_stable_and_fits_int64():
+    fingerprint = simhash(main_text(page(FEES)))
+    assert fingerprint == simhash(main_text(page(FEES)))
+    assert -(1 << 63) <= fingerprint < 1 << 63
+
+
+def test_simhash_skips_short_text():
+    words = ' '.join(f"word{i}" for i in range(MIN_SHINGLES + 1))
+    assert simhash(words) is None
+    assert simhash(words + ' word') is not None
+    # A short page is only its chrome; it must not be fingerprinted
+    assert simhash(main_text(page('<p>Coming soon.</p>'))) is None
+
+
+def test_simhash_ignores_chrome_differences():
+    soup = page(FEES)
+    soup.find('footer').append('Last updated on the fifteenth of June.')
+    assert simhash(main_text(soup)) == simhash(main_text(page(FEES)))
+    assert simhash(main_text(page(FEES, chrome=False))) == simhash(main_text(page(FEES)))
+
+
+def test_simhash_ignores_markup_and_case():
+    # The same notice reposted with different markup, as on a print or AMP version
+    reposted = FEES.replace('<p>', '<div class="entry-content"><span>').replace('</p>', '</span></div>').upper()
+    assert hamming_distance(simhash(main_text(page(FEES))), simhash(main_text(page(reposted)))) == 0
+
+
+def test_pages_sharing_only_a_footer_are_not_duplicates():
+    fees = simhash(main_text(page(FEES)))
+    faculty = simhash(main_text(page(FACULTY)))
+    assert hamming_distance(fees, faculty) > 3
+    index = NearDuplicateIndex(3)
+    index.add('https://kanchiuniv.ac.in/fees/', fees)
+    assert index.find(faculty, 'https://kanchiuniv.ac.in/faculty/') is None
+
+
+def test_home_page_chrome_does_not_swallow_other_pages():
+    home = simhash(main_text(page('<h2>Welcome</h2>')))
+    assert home is None
+    index = NearDuplicateIndex(3)
+    for url, body in (('https://kanchiuniv.ac.in/fees/', FEES), ('https://kanchiuniv.ac.in/faculty/', FACULTY)):
+        fingerprint = simhash(main_text(page(body)))
+        assert index.find(fingerprint, url) is None
+        index.add(url, fingerprint)
+    assert len(index) == 2
+
+
+def test_index_finds_near_duplicate():
+    index = NearDuplicateIndex(3)
+    index.add('https://kanchiuniv.ac.in/fees/', 0b1011 << 40)
+    assert index.find((0b1011 << 40) ^ 0b111, 'https://kanchiuniv.ac.in/?page_id=7') == 'https://kanchiuniv.ac.in/fees/'
+    assert index.find((0b1011 << 40) ^ 0b1111, 'https://kanchiuniv.ac.in/?page_id=7') is None
+
+
+def test_index_skips_the_page_itself():
+    index = NearDuplicateIndex(3)
+    index.add('https://kanchiuniv.ac.in/fees/', 12345)
+    assert index.find(12345, 'https://kanchiuniv.ac.in/fees/') is None
+
+
+def test_index_handles_negative_fingerprints():
+    index = NearDuplicateIndex(3)
+    index.add('https://kanchiuniv.ac.in/fees/', -2)
+    assert index.find(-1, 'https://kanchiuniv.ac.in/other/') == 'https://kanchiuniv.ac.in/fees/'
+
+
+def test_index_add_replaces_and_remove_forgets():
+    index = NearDuplicateIndex(3)
+    index.add('https://kanchiuniv.ac.in/fees/', 0)
+    index.add('https://kanchiuniv.ac.in/fees/', -1)
+    assert len(index) == 1
+    assert index.find(0, 'https://kanchiuniv.ac.in/other/') is None
+    index.remove('https://kanchiuniv.ac.in/fees/')
+    index.remove('https://kanchiuniv.ac.in/missing/')
+    assert len(index) == 0
+    assert index.find(-1, 'https://kanchiuniv.ac.in/other/') is None
@@ -0,0 +1,50 @@
+import pytest
+
+from prompt_builder import CHARS_PER_TOKEN, PromptAssembler, truncate_cleanly
+
+TRUNCATIONS = [
+    ('Sentence one. Sentence two is here. Three.', 100, 'Sentence one. Sentence two is here. Three.'),
+    ('Sentence one. Sentence two is here. Three.', 38, 'Sentence one. Sentence two is here.'),
+    ('Sentence one. Sentence two is here. Three.', 0, ''),
+    ('Sentence one. Sentence two is here. Three.', -5, ''),
+    ('alpha beta gamma delta epsilon', 20, 'alpha beta gamma…'),
+]
+
+CONTEXT = ' '.join(f"Sentence number {i} about hostel fees and admissions." for i in range(200))
+
+
+def passage(title, text, score):
+    return {'title': title, 'heading': '', 'text': text, 'score': score}
+
+
+@pytest.mark.parametrize('text, max_chars, expected', TRUNCATIONS)
+def test_truncate_cleanly(text, max_chars, expected):
+    assert truncate_cleanly(text, max_chars) == expected
+    assert len(truncate_cleanly(text, max_chars)) <= max(max_chars, 0)
+
+
+@pytest.mark.parametrize('question_chars', [100, 2000, 4200])
+@pytest.mark.parametrize('use_passages', [False, True])
+def test_prompt_stays_within_budget(question_chars, use_passages):
+    assembler = PromptAssembler(default_budget=1000)
+    question = ('what is the hostel fee ' * 200)[:question_chars]
+    passages = [passage(f"Page {i}", CONTEXT[i * 500:(i + 1) * 500], 1.0) for i in range(8)] if use_passages else None
+    prompt = assembler.build(question, 'english', passages=passages, context_text=CONTEXT)
+    assert prompt.chars <= 1000 * CHARS_PER_TOKEN
+
+
+def test_paths_agree_when_question_leaves_no_room():
+    assembler = PromptAssembler(default_budget=100, max_question_chars=10000)
+    question = 'hostel fee ' * 60
+    from_text = assembler.build(question, 'english', context_text=CONTEXT)
+    from_passages = assembler.build(question, 'english', passages=[passage('Hostel', CONTEXT, 1.0)])
+    assert from_text.context == from_passages.context == ''
+    assert from_text.truncated and from_passages.truncated
+
+
+def test_passages_keep_selection_order():
+    # select_passages ranks by score and term coverage; a lower raw score can come first
+    passages = [passage('Fees', 'Hostel fee is 40000 a year.', 2.0),
+                passage('News', 'The hostel hosted a cultural fest.', 9.0)]
+    prompt = PromptAssembler().build('hostel fee', 'english', passages=passages)
+    assert prompt.context.index('From Fees') < prompt.context.index('From News')
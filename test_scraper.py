@@ -0,0 +1,75 @@
+from unittest import mock
+
+import httpx
+import pytest
+
+import scraper
+
+mongomock = pytest.importorskip('mongomock')
+
+PAGES = 12
+BUCKETS = ('new', 'changed', 'unchanged', 'removed', 'duplicates')
+
+
+def body(n):
+    return ' '.join(f"page{n}word{i}" for i in range(80))
+
+
+def handler(request):
+    path = request.url.path.strip('/')
+    if path == '':
+        links = ''.join(f'<a href="/{n}/">{n}</a>' for n in range(PAGES)) + '<a href="/copy/">copy</a>'
+        text = body('home')
+    elif path == 'copy':
+        # The same notice reposted under a second URL
+        links, text = '', body(3)
+    else:
+        links, text = '', body(int(path))
+    etag = f'"{path or "home"}"'
+    # Half the pages send no ETag, so incremental runs compare content hashes instead
+    headers = {'etag': etag} if path.isdigit() and int(path) % 2 else {}
+    if request.headers.get('if-none-match') == etag:
+        return httpx.Response(304)
+    return httpx.Response(200, text=f'<html><body><main><p>{text}</p>{links}</main></body></html>', headers=headers)
+
+
+@pytest.fixture
+def crawl():
+    client = mongomock.MongoClient()
+    real_client = httpx.AsyncClient
+
+    def run(incremental, dedup=True):
+        with mock.patch.object(scraper.UniversityScraper, 'ensure_indexes'), \
+                mock.patch.object(scraper, 'MongoClient', lambda *args, **kwargs: client):
+            crawler = scraper.UniversityScraper()
+        crawler.politeness_delay = 0
+        crawler.idle_poll = 0.01
+        if not dedup:
+            # As stored before near-duplicate detection, or under an older fingerprint
+            crawler.near_duplicates.find = lambda fingerprint, url=None: None
+        transport = httpx.MockTransport(handler)
+        with mock.patch.object(httpx, 'AsyncClient', lambda **kwargs: real_client(transport=transport, **kwargs)):
+            return crawler.crawl(incremental=incremental)
+
+    return run
+
+
+def test_each_page_is_counted_once(crawl):
+    stats = crawl(False, dedup=False)
+    assert stats['new'] == stats['fetched'] == PAGES + 2
+    # Both stored copies are unchanged; dropping one counts as removed only
+    stats = crawl(False)
+    assert sum(stats[bucket] for bucket in BUCKETS) == stats['fetched'] == PAGES + 2
+    assert stats['removed'] == 1
+    assert stats['duplicates'] == 0
+
+
+def test_unchanged_incremental_rerun_keeps_crawl_version(crawl):
+    first = crawl(False)
+    assert first['new'] == PAGES + 1
+    assert first['duplicates'] == 1
+    rerun = crawl(True)
+    # The skipped copy has no stored validators, so it is fetched and skipped again
+    assert rerun['duplicates'] == 1
+    assert rerun['unchanged'] == PAGES + 1
+    assert not scraper.UniversityScraper.pages_changed(rerun)